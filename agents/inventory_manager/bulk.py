@@ -0,0 +1,135 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import sqlite, postgresql
+from datetime import datetime
+from typing import Dict, List, Any
+from .database import InventoryItemDB
+from .models import InventoryItem
+from .ledger import record_quantity_changes
+
+# Rows per INSERT statement, keeping well under SQLite's bound parameter limit
+UPSERT_CHUNK_SIZE = 500
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE support
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert
+}
+
+def merge_items(items: List[Dict[str, Any]], normalize) -> Dict[str, Dict[str, Any]]:
+    """
+    Combine lines that refer to the same item, summing their quantities.
+
+    The first line's category and unit win. Keys are normalized names.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        name = normalize(item["name"])
+        if name in merged:
+            merged[name]["quantity"] += item["quantity"]
+        else:
+            merged[name] = {**item, "name": name}
+    return merged
+
+def bulk_add_quantities(db: Session, merged: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Add quantities to existing items and create missing ones.
+
+    Uses one IN query to classify names and INSERT ... ON CONFLICT DO UPDATE
+    batches to apply the changes, so the number of round trips does not
+    depend on the number of lines. The additions are recorded in the
+    ledger as "receipt" rows. The caller commits. Returns
+    "created" or "updated" per normalized name.
+    """
+    if not merged:
+        return {}
+
+    existing = {
+        name for (name,) in db.query(InventoryItemDB.name).filter(
+            InventoryItemDB.name.in_(list(merged))
+        )
+    }
+    outcome = {name: "updated" if name in existing else "created" for name in merged}
+
+    now = datetime.now()
+    rows = [
+        {
+            "name": name,
+            "category": item["category"],
+            "quantity": item["quantity"],
+            "unit": item["unit"],
+            "low_stock_threshold": 2.0,
+            "last_updated": now
+        }
+        for name, item in merged.items()
+    ]
+
+    record_quantity_changes(
+        db, {name: item["quantity"] for name, item in merged.items()}, "receipt", now
+    )
+
+    insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        _add_quantities_orm(db, rows, existing)
+        return outcome
+
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(InventoryItemDB).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[InventoryItemDB.name],
+            set_={
+                "quantity": InventoryItemDB.quantity + stmt.excluded.quantity,
+                "last_updated": stmt.excluded.last_updated
+            }
+        )
+        db.execute(stmt)
+    return outcome
+
+def bulk_set_items(db: Session, items: Dict[str, InventoryItem]) -> Dict[str, str]:
+    """
+    Create or overwrite items keyed by normalized name.
+
+    Existing rows are loaded with one IN query per UPSERT_CHUNK_SIZE names
+    and updated in place, so one flush writes the whole batch. The caller
+    commits. Returns "created" or "updated" per normalized name.
+    """
+    names = list(items)
+    existing: Dict[str, InventoryItemDB] = {}
+    for start in range(0, len(names), UPSERT_CHUNK_SIZE):
+        existing.update(
+            (row.name, row) for row in db.query(InventoryItemDB).filter(
+                InventoryItemDB.name.in_(names[start:start + UPSERT_CHUNK_SIZE])
+            )
+        )
+
+    now = datetime.now()
+    outcome: Dict[str, str] = {}
+    deltas: Dict[str, float] = {}
+    for name, item in items.items():
+        values = {**item.dict(exclude={"last_updated"}), "name": name, "last_updated": now}
+        row = existing.get(name)
+        if row:
+            deltas[name] = item.quantity - (row.quantity or 0)
+            for key, value in values.items():
+                setattr(row, key, value)
+            outcome[name] = "updated"
+        else:
+            deltas[name] = item.quantity
+            db.add(InventoryItemDB(**values))
+            outcome[name] = "created"
+    record_quantity_changes(db, deltas, "update", now)
+    return outcome
+
+def _add_quantities_orm(db: Session, rows: List[Dict[str, Any]], existing: set) -> None:
+    """Fallback for databases without ON CONFLICT: one query for all existing rows."""
+    items = {
+        item.name: item for item in db.query(InventoryItemDB).filter(
+            InventoryItemDB.name.in_(existing)
+        )
+    } if existing else {}
+    for row in rows:
+        item = items.get(row["name"])
+        if item:
+            item.quantity += row["quantity"]
+            item.last_updated = row["last_updated"]
+        else:
+            db.add(InventoryItemDB(**row))
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Enum as SQLEnum, Float
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, ForeignKey, Index, Enum as SQLEnum, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -22,14 +22,61 @@ class InventoryItemDB(Base):
     category = Column(SQLEnum(ItemCategory))
     quantity = Column(Float)
     unit = Column(SQLEnum(ItemUnit))
-    expiry_date = Column(DateTime, nullable=True)
+    expiry_date = Column(DateTime, nullable=True, index=True)
     last_updated = Column(DateTime, default=datetime.now)
     low_stock_threshold = Column(Float, default=2.0)
     notes = Column(String(500), nullable=True)
 
+class ProcessedReceiptDB(Base):
+    """Database model for receipts already applied to inventory"""
+    __tablename__ = "processed_receipts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), unique=True, index=True)  # SHA-256 of the image
+    filename = Column(String(255), nullable=True)
+    item_count = Column(Integer)
+    processed_at = Column(DateTime, default=datetime.now)
+
+class LowStockDB(Base):
+    """
+    Database model for each item's low-stock flag.
+
+    Kept in step with inventory_items by low_stock.refresh_low_stock, since
+    quantity < low_stock_threshold compares two columns and cannot use an index.
+    """
+    __tablename__ = "low_stock_flags"
+    __table_args__ = (
+        Index("ix_low_stock_flags_category_is_low", "category", "is_low"),
+    )
+
+    item_id = Column(Integer, ForeignKey("inventory_items.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(SQLEnum(ItemCategory))  # Copied from the item so the index covers it
+    is_low = Column(Boolean, default=False)
+
+class InventoryLedgerDB(Base):
+    """Database model for the append-only log of inventory quantity changes"""
+    __tablename__ = "inventory_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    item_name = Column(String(100), index=True)
+    delta = Column(Float)  # Change in quantity; negative means consumed
+    reason = Column(String(20))  # "receipt", "update" or "delete"
+    timestamp = Column(DateTime, default=datetime.now, index=True)
+
+class SchemaMigrationDB(Base):
+    """Database model recording data migrations that have been applied"""
+    __tablename__ = "schema_migrations"
+
+    name = Column(String(100), primary_key=True)
+    applied_at = Column(DateTime, default=datetime.now)
+
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+# create_all skips indexes on tables that already exist
+for index in InventoryItemDB.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,130 @@
+from sqlalchemy.orm import Session
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import heapq
+import os
+import threading
+from .database import InventoryItemDB
+
+# Items are announced as expiring soon this many hours before they expire
+EXPIRY_NOTICE_HOURS = float(os.getenv("EXPIRY_NOTICE_HOURS", "48"))
+
+# Expiring-soon notices kept for polling before the oldest are dropped
+MAX_NOTICES = int(os.getenv("EXPIRY_MAX_NOTICES", "500"))
+
+class ExpiryScheduler:
+    """
+    Min-heap of upcoming expiry dates that announces items as they come
+    within EXPIRY_NOTICE_HOURS of expiring.
+
+    The heap is loaded once from the expiry_date index and then kept current
+    by the write endpoints, so no periodic table scans are needed. Updates
+    push a new entry instead of searching the heap; entries whose date no
+    longer matches the item's current expiry are skipped when they surface.
+    Items are keyed by their normalized name. An item is announced once per
+    expiry date; edits that keep the date do not announce it again.
+    """
+
+    def __init__(self, notice_hours: float = EXPIRY_NOTICE_HOURS, max_notices: int = MAX_NOTICES):
+        self.notice = timedelta(hours=notice_hours)
+        self._heap: List[Tuple[datetime, str]] = []
+        self._expiry: Dict[str, datetime] = {}  # Pending items and their current expiry
+        self._announced: Dict[str, datetime] = {}  # Items already announced for this expiry
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.notices: deque = deque(maxlen=max_notices)
+
+    def load(self, db: Session) -> int:
+        """Track every item that has not expired yet. Returns the number tracked."""
+        rows = db.query(InventoryItemDB.name, InventoryItemDB.expiry_date).filter(
+            InventoryItemDB.expiry_date > datetime.now()
+        ).all()
+        with self._condition:
+            rows = [(name, expiry_date) for name, expiry_date in rows if self._announced.get(name) != expiry_date]
+            self._expiry = {name: expiry_date for name, expiry_date in rows}
+            self._heap = [(expiry_date, name) for name, expiry_date in rows]
+            heapq.heapify(self._heap)
+            self._condition.notify()
+        return len(rows)
+
+    def track(self, name: str, expiry_date: Optional[datetime]) -> None:
+        """Record an item's new expiry date; None or a past date stops tracking it."""
+        if expiry_date is None or expiry_date <= datetime.now():
+            self.untrack(name)
+            return
+        with self._condition:
+            if self._expiry.get(name) == expiry_date or self._announced.get(name) == expiry_date:
+                return
+            # Re-armed only when the expiry date changes
+            self._announced.pop(name, None)
+            self._expiry[name] = expiry_date
+            heapq.heappush(self._heap, (expiry_date, name))
+            self._compact()
+            self._condition.notify()
+
+    def untrack(self, name: str) -> None:
+        """Stop tracking an item; its heap entries become stale."""
+        with self._condition:
+            self._expiry.pop(name, None)
+            self._announced.pop(name, None)
+
+    def recent_notices(self, limit: int) -> List[Dict[str, Any]]:
+        with self._condition:
+            return list(self.notices)[-limit:][::-1]
+
+    def start(self) -> None:
+        """Announce items on a background thread until stopped."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="expiry-notifier", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        with self._condition:
+            self._condition.notify()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _compact(self) -> None:
+        """Rebuild the heap once stale entries outnumber live ones."""
+        if len(self._heap) > 2 * len(self._expiry) + 64:
+            self._heap = [(expiry_date, name) for name, expiry_date in self._expiry.items()]
+            heapq.heapify(self._heap)
+
+    def _run(self) -> None:
+        with self._condition:
+            while not self._stop.is_set():
+                timeout = None
+                now = datetime.now()
+                while self._heap:
+                    expiry_date, name = self._heap[0]
+                    if self._expiry.get(name) != expiry_date:
+                        heapq.heappop(self._heap)
+                        continue
+                    due = expiry_date - self.notice
+                    if due > now:
+                        timeout = (due - now).total_seconds()
+                        break
+                    heapq.heappop(self._heap)
+                    del self._expiry[name]
+                    self._announced[name] = expiry_date
+                    self._announce(name, expiry_date, now)
+                # Woken early when an earlier entry is pushed or on stop
+                self._condition.wait(timeout)
+
+    def _announce(self, name: str, expiry_date: datetime, now: datetime) -> None:
+        notice = {
+            "event": "expiring_soon",
+            "name": name,
+            "expiry_date": expiry_date,
+            "hours_left": round((expiry_date - now).total_seconds() / 3600, 1),
+            "notified_at": now
+        }
+        self.notices.append(notice)
+        print(f"Expiring soon: {name} on {expiry_date:%Y-%m-%d %H:%M}")
+
+expiry_scheduler = ExpiryScheduler()
@@ -0,0 +1,151 @@
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+import math
+import os
+import threading
+import numpy as np
+from .database import InventoryLedgerDB
+
+# Consumption older than this counts half as much toward the current rate
+HALF_LIFE_DAYS = float(os.getenv("FORECAST_HALF_LIFE_DAYS", "14"))
+
+# Rows pulled from inventory_ledger per refresh query
+LOAD_BATCH_SIZE = 10000
+
+SECONDS_PER_DAY = 86400.0
+
+class ConsumptionForecaster:
+    """
+    Per-item consumption rates computed incrementally from inventory_ledger.
+
+    Each item keeps an exponentially decayed sum of the quantity consumed,
+    the time of its last ledger row and the time of its first one, stored in
+    column arrays indexed by item slot. refresh() only reads ledger rows
+    with an id above the last one loaded and folds them into the slots of
+    the items they touch; rates for all items are then derived in one
+    vectorized pass at read time.
+
+    The rate is decayed_sum / tau, corrected by 1 - exp(-age / tau) so items
+    with a short history are not underestimated.
+    """
+
+    def __init__(self, half_life_days: float = HALF_LIFE_DAYS, capacity: int = 256):
+        self.tau = half_life_days * SECONDS_PER_DAY / math.log(2)
+        self._lock = threading.Lock()
+        self._slots: Dict[str, int] = {}
+        self.decayed = np.zeros(capacity, dtype=np.float64)  # Decayed consumption at last_seen
+        self.last_seen = np.zeros(capacity, dtype=np.float64)  # Epoch seconds
+        self.first_seen = np.zeros(capacity, dtype=np.float64)
+        self._last_id = 0
+
+    def _slot_array(self, names: np.ndarray) -> np.ndarray:
+        """Map item names to slots, allocating slots for new items."""
+        slots = np.empty(len(names), dtype=np.int64)
+        for i, name in enumerate(names):
+            slot = self._slots.get(name)
+            if slot is None:
+                slot = self._slots[name] = len(self._slots)
+            slots[i] = slot
+        needed = len(self._slots)
+        if needed > len(self.decayed):
+            capacity = max(needed, 2 * len(self.decayed))
+            for attr in ("decayed", "last_seen", "first_seen"):
+                grown = np.zeros(capacity, dtype=np.float64)
+                grown[:len(getattr(self, attr))] = getattr(self, attr)
+                setattr(self, attr, grown)
+        return slots
+
+    def refresh(self, db: Session) -> int:
+        """Fold ledger rows added since the last refresh. Returns the number of items touched."""
+        touched = set()
+        with self._lock:
+            while True:
+                rows = db.query(
+                    InventoryLedgerDB.id,
+                    InventoryLedgerDB.item_name,
+                    InventoryLedgerDB.delta,
+                    InventoryLedgerDB.reason,
+                    InventoryLedgerDB.timestamp
+                ).filter(
+                    InventoryLedgerDB.id > self._last_id
+                ).order_by(InventoryLedgerDB.id).limit(LOAD_BATCH_SIZE).all()
+                if not rows:
+                    break
+
+                names, codes = np.unique([row.item_name for row in rows], return_inverse=True)
+                times = np.array([row.timestamp.timestamp() for row in rows], dtype=np.float64)
+                deltas = np.array([row.delta for row in rows], dtype=np.float64)
+                # Deletions remove stock without it being used up
+                consumed = np.where(
+                    (deltas < 0) & np.array([row.reason != "delete" for row in rows]),
+                    -deltas, 0.0
+                )
+                self._fold(self._slot_array(names), codes, times, consumed)
+                touched.update(names.tolist())
+
+                self._last_id = rows[-1].id
+                if len(rows) < LOAD_BATCH_SIZE:
+                    break
+        return len(touched)
+
+    def _fold(self, slots: np.ndarray, codes: np.ndarray, times: np.ndarray, consumed: np.ndarray) -> None:
+        """Merge a batch of ledger rows into the per-item accumulators."""
+        count = len(slots)
+        latest = np.full(count, -np.inf)
+        np.maximum.at(latest, codes, times)
+        earliest = np.full(count, np.inf)
+        np.minimum.at(earliest, codes, times)
+
+        # Decay each row's consumption to its item's latest time in this batch
+        weights = consumed * np.exp((times - latest[codes]) / self.tau)
+        batch_decayed = np.bincount(codes, weights=weights, minlength=count)
+
+        is_new = self.last_seen[slots] == 0
+        previous = np.where(
+            is_new, 0.0,
+            self.decayed[slots] * np.exp(-np.maximum(latest - self.last_seen[slots], 0) / self.tau)
+        )
+        self.decayed[slots] = previous + batch_decayed
+        self.first_seen[slots] = np.where(is_new, earliest, np.minimum(self.first_seen[slots], earliest))
+        self.last_seen[slots] = np.maximum(self.last_seen[slots], latest)
+
+    def daily_rates(self, names: List[str], now: Optional[datetime] = None) -> np.ndarray:
+        """Current consumption per day for each name; 0 for items without history."""
+        now_ts = (now or datetime.now()).timestamp()
+        with self._lock:
+            slots = np.array([self._slots.get(name, -1) for name in names], dtype=np.int64)
+            known = slots >= 0
+            rates = np.zeros(len(names), dtype=np.float64)
+            if not known.any():
+                return rates
+            s = slots[known]
+            decayed = self.decayed[s] * np.exp(-np.maximum(now_ts - self.last_seen[s], 0) / self.tau)
+            age = np.maximum(now_ts - self.first_seen[s], SECONDS_PER_DAY)
+            rates[known] = decayed / (self.tau * -np.expm1(-age / self.tau)) * SECONDS_PER_DAY
+        return rates
+
+    def forecast(self, items: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Add daily_rate, days_to_empty and runs_out_on to items with "name" and
+        "quantity", soonest to run out first; items not being consumed go last.
+        """
+        now = now or datetime.now()
+        rates = self.daily_rates([item["name"] for item in items], now)
+        quantities = np.array([item["quantity"] for item in items], dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            days = np.where(rates > 0, quantities / rates, np.inf)
+
+        results = []
+        for i in np.argsort(days, kind="stable"):
+            days_left = float(days[i])
+            finite = math.isfinite(days_left)
+            results.append({
+                **items[i],
+                "daily_rate": round(float(rates[i]), 3),
+                "days_to_empty": round(days_left, 1) if finite else None,
+                "runs_out_on": (now + timedelta(days=days_left)).date() if finite else None
+            })
+        return results
+
+consumption_forecaster = ConsumptionForecaster()
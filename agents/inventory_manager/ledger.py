@@ -0,0 +1,25 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Optional
+from .database import InventoryLedgerDB
+
+def record_quantity_changes(
+    db: Session,
+    deltas: Dict[str, float],
+    reason: str,
+    timestamp: Optional[datetime] = None
+) -> None:
+    """
+    Append one ledger row per item whose quantity changed.
+
+    Zero deltas are skipped. Written with a single executemany in the
+    caller's transaction; the caller commits.
+    """
+    timestamp = timestamp or datetime.now()
+    rows = [
+        {"item_name": name, "delta": delta, "reason": reason, "timestamp": timestamp}
+        for name, delta in deltas.items() if delta
+    ]
+    if rows:
+        db.execute(insert(InventoryLedgerDB), rows)
@@ -0,0 +1,71 @@
+from sqlalchemy import delete, insert, select, func, true
+from sqlalchemy.orm import Session
+from typing import Iterable, List
+from .database import InventoryItemDB, LowStockDB
+
+# Names per statement, keeping well under SQLite's bound parameter limit
+REFRESH_CHUNK_SIZE = 500
+
+def _flag_rows(condition):
+    """SELECT producing low_stock_flags rows for the items matching `condition`."""
+    return select(
+        InventoryItemDB.id,
+        InventoryItemDB.category,
+        (InventoryItemDB.quantity < InventoryItemDB.low_stock_threshold).label("is_low")
+    ).where(condition)
+
+def refresh_low_stock(db: Session, names: Iterable[str]) -> None:
+    """
+    Recompute the low-stock flags of the named items from their current rows.
+
+    Flushes pending ORM changes first; the caller commits. Items that no
+    longer exist simply lose their flag.
+    """
+    names = list(names)
+    if not names:
+        return
+    db.flush()
+
+    for start in range(0, len(names), REFRESH_CHUNK_SIZE):
+        chunk = names[start:start + REFRESH_CHUNK_SIZE]
+        item_ids = select(InventoryItemDB.id).where(InventoryItemDB.name.in_(chunk))
+        db.execute(delete(LowStockDB).where(LowStockDB.item_id.in_(item_ids)))
+        db.execute(insert(LowStockDB).from_select(
+            ["item_id", "category", "is_low"],
+            _flag_rows(InventoryItemDB.name.in_(chunk))
+        ))
+
+def remove_low_stock(db: Session, item_ids: List[int]) -> None:
+    """Drop the flags of items about to be deleted (SQLite does not cascade by default)."""
+    if item_ids:
+        db.execute(delete(LowStockDB).where(LowStockDB.item_id.in_(item_ids)))
+
+def backfill_low_stock(db: Session) -> bool:
+    """
+    Rebuild every flag if the side table is out of step with inventory_items,
+    e.g. on first start after upgrading. Returns True if it was rebuilt.
+
+    Compares contents rather than row counts: an item whose flag is missing
+    or disagrees with its row, or a flag whose item is gone, triggers it.
+    """
+    flag = _flag_rows(true()).subquery()
+    stale_items = select(func.count()).select_from(flag).outerjoin(
+        LowStockDB, LowStockDB.item_id == flag.c.id
+    ).where(
+        (LowStockDB.item_id == None)
+        | (LowStockDB.category != flag.c.category)
+        | (LowStockDB.is_low != flag.c.is_low)
+    )
+    orphan_flags = select(func.count()).select_from(LowStockDB).where(
+        ~LowStockDB.item_id.in_(select(InventoryItemDB.id))
+    )
+    if not db.scalar(stale_items) and not db.scalar(orphan_flags):
+        return False
+
+    db.execute(delete(LowStockDB))
+    db.execute(insert(LowStockDB).from_select(
+        ["item_id", "category", "is_low"],
+        _flag_rows(true())
+    ))
+    db.commit()
+    return True
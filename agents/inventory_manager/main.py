@@ -1,105 +1,290 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Depends
-from typing import Dict, List, Optional, Set, Any
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List, Optional, Set, Any, Tuple, Union
 from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-import pytesseract
-from PIL import Image
-import io
-import re
-from .database import get_db, InventoryItemDB
-from .models import ItemCategory, ItemUnit, InventoryItem
+import asyncio
+import json
+import os
+from .database import get_db, SessionLocal, InventoryItemDB, ProcessedReceiptDB, LowStockDB
+from .ocr import ocr_pool, ocr_jobs, run_ocr, OcrJob
+from .bulk import merge_items, bulk_add_quantities, bulk_set_items
+from .ocr_cache import ocr_cache, content_hash
+from .receipt_parser import receipt_parser
+from .spool import spool_upload, remove_spooled
+from .names import normalize_item_name
+from .migrations import apply_migrations
+from .low_stock import refresh_low_stock, remove_low_stock, backfill_low_stock
+from .expiry import expiry_scheduler
+from .ledger import record_quantity_changes
+from .forecast import consumption_forecaster
+from .models import ItemCategory, InventoryItem
 
 router = APIRouter()
 
-def normalize_item_name(name: str) -> str:
-    """Normalize item name for consistent storage and retrieval."""
-    return name.lower().strip()
+# Receipts of one batch upload processed at a time; defaults to the OCR pool size
+BATCH_CONCURRENCY = int(os.getenv("RECEIPT_BATCH_CONCURRENCY", "0")) or ocr_pool.workers
 
 def extract_items_from_receipt(text: str) -> List[dict]:
     """
-    Extract items from receipt text using regex patterns.
-    This is a basic implementation - can be enhanced with ML/AI for better accuracy.
+    Extract items from receipt text using the precompiled receipt parser.
+    Categories and unit aliases come from mock_data/category_keywords.json.
     """
-    # Example pattern: looking for quantity and item name
-    # Pattern matches: "2 MILK", "1.5 LB APPLES", "3 BOXES CEREAL"
-    pattern = r'(\d+\.?\d*)\s*(?:(?:' + '|'.join(unit.value for unit in ItemUnit) + r')\s+)?([A-Za-z\s]+)'
-    matches = re.finditer(pattern, text)
-    
-    items = []
-    for match in matches:
-        quantity = float(match.group(1))
-        name = match.group(2).strip()
+    return receipt_parser.parse(text)
+
+def apply_receipt_items(db: Session, extracted_items: List[dict]) -> List[str]:
+    """Add extracted receipt items to inventory without committing. Returns the item names."""
+    # Lines for the same item are merged so each name is written once
+    merged = merge_items(extracted_items, normalize_item_name)
+    bulk_add_quantities(db, merged)
+    refresh_low_stock(db, merged)
+    return [item_data["name"] for item_data in extracted_items]
+
+def duplicate_receipt_response(receipt: ProcessedReceiptDB) -> Dict[str, Any]:
+    return {
+        "status": "duplicate",
+        "message": "Receipt was already processed; inventory was not changed.",
+        "processed_items": [],
+        "processed_at": receipt.processed_at
+    }
+
+async def process_receipt(
+    db: Session,
+    source: Union[bytes, str],
+    filename: Optional[str] = None,
+    idempotent: bool = True,
+    receipt_hash: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    OCR a receipt image in the worker pool and add its items to inventory.
+
+    `source` is the image bytes or the path of a spooled upload, in which
+    case `receipt_hash` must be given; errors then name `filename` rather
+    than the spool path. OCR output is cached by image hash.
+    In idempotent mode a receipt whose hash was already applied leaves
+    inventory unchanged.
+    """
+    if receipt_hash is None:
+        receipt_hash = content_hash(source)
+    
+    if idempotent:
+        receipt = db.query(ProcessedReceiptDB).filter(
+            ProcessedReceiptDB.content_hash == receipt_hash
+        ).first()
+        if receipt:
+            return duplicate_receipt_response(receipt)
+    
+    cached = ocr_cache.get(receipt_hash)
+    if cached:
+        extracted_items = cached["items"]
+        timings = {}
+    else:
+        try:
+            ocr = await ocr_pool.run(run_ocr, source)
+        except Exception as e:
+            if isinstance(source, str):
+                # Errors opening the image name the spool path; show the upload's name instead
+                raise RuntimeError(str(e).replace(source, filename or "receipt")) from None
+            raise
         
-        # Basic categorization - can be enhanced with ML/AI
-        category = ItemCategory.OTHER
-        if any(word in name.lower() for word in ["chips", "candy", "snack"]):
-            category = ItemCategory.SNACKS
-        elif any(word in name.lower() for word in ["milk", "bread", "fruit", "vegetable"]):
-            category = ItemCategory.GROCERIES
-        elif any(word in name.lower() for word in ["soap", "paper", "cleaner"]):
-            category = ItemCategory.HOUSEHOLD
-            
-        items.append({
-            "name": name,
-            "quantity": quantity,
-            "category": category,
-            "unit": ItemUnit.PIECES  # Default unit - can be enhanced
-        })
-    
-    return items
+        # Extract items from OCR text
+        extracted_items = extract_items_from_receipt(ocr["text"])
+        ocr_cache.put(receipt_hash, ocr["text"], extracted_items)
+        timings = ocr["timings_ms"]
+    
+    updated_items = apply_receipt_items(db, extracted_items)
+    if idempotent:
+        db.add(ProcessedReceiptDB(
+            content_hash=receipt_hash,
+            filename=filename,
+            item_count=len(extracted_items)
+        ))
+    
+    try:
+        db.commit()
+    except IntegrityError:
+        # The same receipt was committed concurrently
+        db.rollback()
+        receipt = db.query(ProcessedReceiptDB).filter(
+            ProcessedReceiptDB.content_hash == receipt_hash
+        ).first()
+        return duplicate_receipt_response(receipt)
+    
+    return {
+        "status": "success",
+        "message": f"Receipt processed. Added/updated {len(updated_items)} items.",
+        "processed_items": updated_items,
+        "cached": cached is not None,
+        "ocr_timings_ms": timings
+    }
+
+@router.on_event("startup")
+def run_data_migrations() -> None:
+    """Apply data migrations that have not run on this database yet."""
+    db = SessionLocal()
+    try:
+        apply_migrations(db)
+    finally:
+        db.close()
+
+@router.on_event("startup")
+def sync_low_stock_flags() -> None:
+    """Build low-stock flags for items written before the flags existed."""
+    db = SessionLocal()
+    try:
+        if backfill_low_stock(db):
+            print("Rebuilt low-stock flags")
+    finally:
+        db.close()
+
+@router.on_event("startup")
+def start_expiry_notifier() -> None:
+    """Load upcoming expiry dates and start announcing items about to expire."""
+    db = SessionLocal()
+    try:
+        expiry_scheduler.load(db)
+    finally:
+        db.close()
+    expiry_scheduler.start()
+
+@router.on_event("shutdown")
+def stop_ocr_workers() -> None:
+    """Shut down the OCR worker processes and the expiry notifier."""
+    ocr_pool.shutdown()
+    expiry_scheduler.stop()
 
 @router.post("/upload")
 async def upload_receipt(
     file: UploadFile = File(...),
+    idempotent: bool = Query(True, description="Skip receipts that were already applied"),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """Upload and process a receipt image using OCR."""
+    path = None
     try:
-        # Read and process image
-        content = await file.read()
-        image = Image.open(io.BytesIO(content))
-        
-        # Perform OCR
-        text = pytesseract.image_to_string(image)
-        
-        # Extract items from OCR text
-        extracted_items = extract_items_from_receipt(text)
-        
-        # Update inventory
-        updated_items = []
-        for item_data in extracted_items:
-            normalized_name = normalize_item_name(item_data["name"])
-            
-            # Check if item exists
-            db_item = db.query(InventoryItemDB).filter(
-                InventoryItemDB.name == normalized_name
-            ).first()
-            
-            if db_item:
-                # Update existing item
-                db_item.quantity += item_data["quantity"]
-                db_item.last_updated = datetime.now()
-            else:
-                # Create new item
-                db_item = InventoryItemDB(
-                    name=normalized_name,
-                    category=item_data["category"],
-                    quantity=item_data["quantity"],
-                    unit=item_data["unit"]
-                )
-                db.add(db_item)
-            
-            updated_items.append(item_data["name"])
-        
-        db.commit()
-        
-        return {
-            "status": "success",
-            "message": f"Receipt processed. Added/updated {len(updated_items)} items.",
-            "processed_items": updated_items
-        }
+        path, receipt_hash = await spool_upload(file)
+        return await process_receipt(db, path, file.filename, idempotent, receipt_hash)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing receipt: {str(e)}")
+    finally:
+        if path:
+            remove_spooled(path)
+
+async def stream_batch_results(
+    spooled: List[Tuple[str, str, str]],
+    idempotent: bool
+) -> AsyncIterator[str]:
+    """
+    Process spooled receipts concurrently and yield one NDJSON line per
+    receipt in completion order. At most BATCH_CONCURRENCY receipts are in
+    flight; each file is deleted as soon as its receipt is done.
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def process_one(index: int, filename: str, path: str, receipt_hash: str) -> Dict[str, Any]:
+        async with semaphore:
+            db = SessionLocal()
+            try:
+                result = await process_receipt(db, path, filename, idempotent, receipt_hash)
+            except Exception as e:
+                db.rollback()
+                result = {"status": "error", "message": f"Error processing receipt: {str(e)}"}
+            finally:
+                db.close()
+                remove_spooled(path)
+        return {"index": index, "filename": filename, **result}
+    
+    tasks = [
+        asyncio.create_task(process_one(index, filename, path, receipt_hash))
+        for index, (filename, path, receipt_hash) in enumerate(spooled)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield json.dumps(await next_done, default=str) + "\n"
+    finally:
+        # Client went away or the stream finished: stop pending work and
+        # remove files of receipts that never started
+        for task in tasks:
+            task.cancel()
+        for _, path, _ in spooled:
+            remove_spooled(path)
+
+@router.post("/upload/batch")
+async def upload_receipt_batch(
+    files: List[UploadFile] = File(...),
+    idempotent: bool = Query(True, description="Skip receipts that were already applied")
+) -> StreamingResponse:
+    """
+    Upload several receipt images and stream per-receipt results as NDJSON.
+
+    Each file is copied to a named temporary file so the OCR worker
+    processes can read it by path while results stream.
+    """
+    spooled: List[Tuple[str, str, str]] = []
+    try:
+        for file in files:
+            path, receipt_hash = await spool_upload(file)
+            spooled.append((file.filename, path, receipt_hash))
+    except Exception as e:
+        for _, path, _ in spooled:
+            remove_spooled(path)
+        raise HTTPException(status_code=500, detail=f"Error receiving receipts: {str(e)}")
+    
+    return StreamingResponse(
+        stream_batch_results(spooled, idempotent),
+        media_type="application/x-ndjson"
+    )
+
+@router.post("/upload/jobs", status_code=202)
+async def submit_receipt_job(
+    file: UploadFile = File(...),
+    idempotent: bool = Query(True, description="Skip receipts that were already applied")
+) -> Dict[str, Any]:
+    """
+    Queue a receipt for background OCR and return a job ID to poll.
+
+    The upload is spooled to temporary storage like /upload and deleted
+    when the job finishes.
+    """
+    try:
+        path, receipt_hash = await spool_upload(file)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error receiving receipt: {str(e)}")
+    
+    async def work(job: OcrJob) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            return await process_receipt(db, path, file.filename, idempotent, receipt_hash)
+        finally:
+            db.close()
+            remove_spooled(path)
+    
+    job = ocr_jobs.submit(file.filename, work)
+    return {"job_id": job.id, "status": job.status}
+
+@router.get("/upload/cache")
+async def get_ocr_cache_stats() -> Dict[str, Any]:
+    """Get OCR result cache usage and hit rate."""
+    return ocr_cache.stats()
+
+@router.get("/upload/jobs/{job_id}")
+async def get_receipt_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the job to finish")
+) -> Dict[str, Any]:
+    """Get the status and result of a receipt job, optionally waiting for it."""
+    job = ocr_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if wait and not job.done.is_set():
+        try:
+            await asyncio.wait_for(job.done.wait(), wait)
+        except asyncio.TimeoutError:
+            pass
+    
+    return job.to_dict()
 
 @router.get("/snacks", response_model=List[InventoryItem])
 async def get_snacks(
@@ -147,18 +332,72 @@ async def update_inventory(
     
     if db_item:
         # Update existing item
+        delta = item.quantity - (db_item.quantity or 0)
         for key, value in item.dict(exclude={"last_updated"}).items():
             setattr(db_item, key, value)
+        db_item.name = normalized_name
         db_item.last_updated = datetime.now()
     else:
         # Create new item
-        db_item = InventoryItemDB(**item.dict())
+        delta = item.quantity
+        db_item = InventoryItemDB(**{**item.dict(), "name": normalized_name})
         db.add(db_item)
     
+    record_quantity_changes(db, {db_item.name: delta}, "update")
+    refresh_low_stock(db, [db_item.name])
     db.commit()
     db.refresh(db_item)
+    expiry_scheduler.track(normalized_name, db_item.expiry_date)
     return InventoryItem.from_orm(db_item)
 
+@router.post("/inventory/update/batch")
+async def update_inventory_batch(
+    items: List[InventoryItem],
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Update or add many items in one transaction.
+
+    Items with a past expiry date are rejected individually; the rest are
+    applied together or, on a database error, not at all. When a name
+    appears more than once the last entry wins.
+    """
+    now = datetime.now()
+    results: List[Dict[str, Any]] = []
+    accepted: Dict[str, InventoryItem] = {}
+    for item in items:
+        normalized_name = normalize_item_name(item.name)
+        if item.expiry_date and item.expiry_date < now:
+            results.append({
+                "name": normalized_name,
+                "status": "rejected",
+                "detail": "Cannot add item with past expiry date"
+            })
+            continue
+        accepted[normalized_name] = item
+        results.append({"name": normalized_name, "status": None})
+    
+    try:
+        outcome = bulk_set_items(db, accepted)
+        refresh_low_stock(db, accepted)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error updating inventory: {str(e)}")
+    
+    for name, item in accepted.items():
+        expiry_scheduler.track(name, item.expiry_date)
+    for result in results:
+        if result["status"] is None:
+            result["status"] = outcome[result["name"]]
+    
+    return {
+        "status": "success",
+        "applied": len(accepted),
+        "rejected": sum(1 for result in results if result["status"] == "rejected"),
+        "results": results
+    }
+
 @router.get("/inventory/low", response_model=List[InventoryItem])
 async def get_low_inventory(
     categories: Optional[Set[ItemCategory]] = Query(None),
@@ -166,13 +405,14 @@ async def get_low_inventory(
     db: Session = Depends(get_db)
 ) -> List[InventoryItem]:
     """Get items with quantity below their low stock threshold."""
-    query = db.query(InventoryItemDB).filter(
-        InventoryItemDB.quantity < InventoryItemDB.low_stock_threshold
+    # Always filter on category so the (category, is_low) index applies
+    query = db.query(InventoryItemDB).join(
+        LowStockDB, LowStockDB.item_id == InventoryItemDB.id
+    ).filter(
+        LowStockDB.category.in_(categories or set(ItemCategory)),
+        LowStockDB.is_low == True
     )
     
-    if categories:
-        query = query.filter(InventoryItemDB.category.in_(categories))
-    
     if exclude_expired:
         query = query.filter(
             (InventoryItemDB.expiry_date == None) | 
@@ -186,6 +426,58 @@ async def get_low_inventory(
     
     return [InventoryItem.from_orm(item) for item in items]
 
+@router.get("/inventory/forecast")
+async def get_inventory_forecast(
+    categories: Optional[Set[ItemCategory]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, description="Return only the items running out soonest"),
+    db: Session = Depends(get_db)
+) -> List[Dict[str, Any]]:
+    """
+    Forecast when items run out from their recent consumption rate,
+    soonest first. Items that are not being consumed come last.
+    """
+    try:
+        consumption_forecaster.refresh(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating forecast: {str(e)}")
+    
+    query = db.query(
+        InventoryItemDB.name,
+        InventoryItemDB.category,
+        InventoryItemDB.quantity,
+        InventoryItemDB.unit
+    )
+    if categories:
+        query = query.filter(InventoryItemDB.category.in_(categories))
+    
+    items = [
+        {"name": row.name, "category": row.category, "quantity": row.quantity, "unit": row.unit}
+        for row in query
+    ]
+    forecast = consumption_forecaster.forecast(items)
+    return forecast[:limit] if limit else forecast
+
+@router.get("/inventory/expiring", response_model=List[InventoryItem])
+async def get_expiring_items(
+    within: float = Query(48, gt=0, description="Hours ahead to look"),
+    db: Session = Depends(get_db)
+) -> List[InventoryItem]:
+    """Get items expiring within the given number of hours, soonest first."""
+    now = datetime.now()
+    items = db.query(InventoryItemDB).filter(
+        InventoryItemDB.expiry_date > now,
+        InventoryItemDB.expiry_date <= now + timedelta(hours=within)
+    ).order_by(InventoryItemDB.expiry_date).all()
+    
+    return [InventoryItem.from_orm(item) for item in items]
+
+@router.get("/inventory/expiring/notices")
+async def get_expiry_notices(
+    limit: int = Query(50, ge=1, le=500)
+) -> List[Dict[str, Any]]:
+    """Get the most recent expiring-soon notices, newest first."""
+    return expiry_scheduler.recent_notices(limit)
+
 @router.delete("/inventory/{item_name}")
 async def delete_item(
     item_name: str,
@@ -200,8 +492,11 @@ async def delete_item(
     if not db_item:
         raise HTTPException(status_code=404, detail="Item not found")
     
+    remove_low_stock(db, [db_item.id])
+    record_quantity_changes(db, {db_item.name: -(db_item.quantity or 0)}, "delete")
     db.delete(db_item)
     db.commit()
+    expiry_scheduler.untrack(normalized_name)
     
     return {"message": f"Item '{item_name}' deleted successfully"}
 
@@ -0,0 +1,24 @@
+from sqlalchemy.orm import Session
+from typing import Callable, List, Tuple
+from .database import SchemaMigrationDB
+from .names import normalize_stored_names
+
+# Data migrations in the order they must run; names are never reused.
+# Each one commits its own changes and returns the number of rows changed.
+MIGRATIONS: List[Tuple[str, Callable[[Session], int]]] = [
+    ("0001_normalize_item_names", normalize_stored_names),
+]
+
+def apply_migrations(db: Session) -> List[str]:
+    """Run the migrations not yet recorded in schema_migrations. Returns their names."""
+    applied = {name for (name,) in db.query(SchemaMigrationDB.name)}
+    ran = []
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        changed = migrate(db)
+        db.add(SchemaMigrationDB(name=name))
+        db.commit()
+        print(f"Applied migration {name} ({changed} rows changed)")
+        ran.append(name)
+    return ran
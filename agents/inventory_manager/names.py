@@ -0,0 +1,73 @@
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+from .database import InventoryItemDB, InventoryLedgerDB
+from .low_stock import refresh_low_stock, remove_low_stock
+
+def normalize_item_name(name: str) -> str:
+    """Normalize item name for consistent storage and retrieval."""
+    return name.lower().strip()
+
+def _unnormalized(column):
+    """
+    SQL filter for names normalize_item_name may change. SQLite's lower()
+    and trim() only handle ASCII letters and spaces, so names with any other
+    characters are included too and checked in Python.
+    """
+    return (column != func.lower(func.trim(column))) | column.op("GLOB")("*[^ -~]*")
+
+def normalize_stored_names(db: Session) -> int:
+    """
+    Rewrite item names stored before every write path normalized them.
+
+    Only rows whose names may change are read, together with the rows
+    already holding their normalized names. Rows whose names normalize to
+    the same value are merged into the most recently updated one, summing
+    their quantities like receipt lines for the same item; each merge is
+    logged. Ledger rows are renamed so consumption history follows the
+    item. Commits; returns the number of rows renamed or merged.
+    """
+    candidates = [
+        row for row in db.query(InventoryItemDB).filter(_unnormalized(InventoryItemDB.name))
+        if row.name != normalize_item_name(row.name)
+    ]
+    if not candidates:
+        return 0
+
+    groups: Dict[str, List[InventoryItemDB]] = defaultdict(list)
+    for row in candidates:
+        groups[normalize_item_name(row.name)].append(row)
+    for row in db.query(InventoryItemDB).filter(InventoryItemDB.name.in_(list(groups))):
+        groups[row.name].append(row)
+
+    changed = 0
+    renamed: Dict[str, str] = {}
+    for name, rows in groups.items():
+        rows.sort(key=lambda row: (row.last_updated or datetime.min, row.id))
+        keeper, merged = rows[-1], rows[:-1]
+        keeper.quantity = sum(row.quantity or 0 for row in rows)
+        for row in rows:
+            if row.name != name:
+                renamed[row.name] = name
+        if merged:
+            print(
+                f"Merged inventory items {', '.join(repr(row.name) for row in rows)} "
+                f"into '{name}' with quantity {keeper.quantity}"
+            )
+        remove_low_stock(db, [row.id for row in merged])
+        for row in merged:
+            db.delete(row)
+        # Free the normalized name before the keeper takes it
+        db.flush()
+        keeper.name = name
+        changed += len(rows)
+
+    for old_name, name in renamed.items():
+        db.execute(
+            update(InventoryLedgerDB).where(InventoryLedgerDB.item_name == old_name).values(item_name=name)
+        )
+    refresh_low_stock(db, set(renamed.values()))
+    db.commit()
+    return changed
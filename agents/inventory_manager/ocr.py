@@ -0,0 +1,135 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, Awaitable, Callable, Union
+from collections import OrderedDict
+import asyncio
+import os
+import threading
+import time
+import uuid
+import pytesseract
+from .preprocess import preprocess_receipt
+
+# Worker processes running Tesseract; defaults to one per core
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or os.cpu_count() or 1
+
+# Finished jobs kept for polling before the oldest are forgotten
+MAX_FINISHED_JOBS = int(os.getenv("OCR_MAX_FINISHED_JOBS", "1000"))
+
+def run_ocr(source: Union[bytes, str]) -> Dict[str, Any]:
+    """
+    Preprocess an image and run Tesseract on it. Runs in a worker process.
+
+    `source` is the image bytes or the path of a spooled upload; passing a
+    path keeps large images out of the parent process and the pool's pipe.
+
+    Returns the recognized text and per-stage timings in milliseconds.
+    """
+    try:
+        image, timings = preprocess_receipt(source)
+        started = time.perf_counter()
+        text = pytesseract.image_to_string(image)
+        timings["ocr"] = round((time.perf_counter() - started) * 1000, 2)
+        return {"text": text, "timings_ms": timings, "size": list(image.size)}
+    except Exception as e:
+        # pytesseract's exceptions cannot be unpickled in the parent, which
+        # would break the whole pool, so re-raise as a plain error
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+class OcrPool:
+    """Lazily started process pool that keeps OCR off the event loop."""
+
+    def __init__(self, workers: int = OCR_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a picklable function in the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+class OcrJob:
+    """State of one asynchronous receipt processing job."""
+
+    def __init__(self, filename: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = "queued"
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error
+        }
+
+class OcrJobQueue:
+    """
+    Tracks receipt jobs running in the background.
+
+    Jobs run as asyncio tasks on the event loop; their OCR step is handed
+    to the process pool. Finished jobs stay available for polling until
+    MAX_FINISHED_JOBS newer ones have completed.
+    """
+
+    def __init__(self, max_finished: int = MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, OcrJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, filename: Optional[str], work: Callable[[OcrJob], Awaitable[Dict[str, Any]]]) -> OcrJob:
+        """Start `work(job)` in the background and return the job."""
+        job = OcrJob(filename)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run(job, work))
+        return job
+
+    def get(self, job_id: str) -> Optional[OcrJob]:
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: OcrJob, work: Callable[[OcrJob], Awaitable[Dict[str, Any]]]) -> None:
+        job.status = "running"
+        try:
+            job.result = await work(job)
+            job.status = "completed"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.now()
+            job.done.set()
+            self._tasks.pop(job.id, None)
+            self._prune()
+
+    def _prune(self) -> None:
+        finished = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None
+        ]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+ocr_pool = OcrPool()
+ocr_jobs = OcrJobQueue()
@@ -0,0 +1,112 @@
+from typing import Dict, Any, Optional, List
+from pathlib import Path
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from .models import ItemCategory, ItemUnit
+
+# Directory holding one JSON file per receipt image hash; defaults to the
+# system temp dir so the cache never lands in the working tree
+CACHE_DIR = os.getenv("OCR_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "ocr_cache")
+
+# Total size the cache may use before least recently used entries are evicted
+CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+def content_hash(content: bytes) -> str:
+    """SHA-256 of the raw upload, used as the cache and idempotency key."""
+    return hashlib.sha256(content).hexdigest()
+
+class OcrCache:
+    """
+    Disk-backed LRU cache of OCR text and extracted items keyed by image hash.
+
+    Recency is tracked with file modification times, which are refreshed on
+    every hit, so the cache survives restarts without a separate index.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for a hash, or None."""
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+                os.utime(path)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self.misses += 1
+                return None
+            self.hits += 1
+        entry["items"] = [self._load_item(item) for item in entry["items"]]
+        return entry
+
+    def put(self, key: str, text: str, items: List[Dict[str, Any]]) -> None:
+        """Store OCR output for a hash and evict old entries if over the size limit."""
+        data = json.dumps({
+            "text": text,
+            "items": [self._dump_item(item) for item in items]
+        }).encode()
+        path = self._path(key)
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            size = self._current_size()
+            if path.exists():
+                size -= path.stat().st_size
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self._size = size + len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes": self._current_size(),
+                "max_bytes": self.max_bytes
+            }
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(
+                path.stat().st_size for path in self.directory.glob("*.json")
+            ) if self.directory.exists() else 0
+        return self._size
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under the size limit."""
+        entries = sorted(
+            ((path.stat().st_mtime, path.stat().st_size, path) for path in self.directory.glob("*.json")),
+            key=lambda entry: entry[0]
+        )
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+        self._size = size
+
+    @staticmethod
+    def _dump_item(item: Dict[str, Any]) -> Dict[str, Any]:
+        return {**item, "category": item["category"].value, "unit": item["unit"].value}
+
+    @staticmethod
+    def _load_item(item: Dict[str, Any]) -> Dict[str, Any]:
+        return {**item, "category": ItemCategory(item["category"]), "unit": ItemUnit(item["unit"])}
+
+ocr_cache = OcrCache()
@@ -0,0 +1,103 @@
+from typing import Dict, Tuple, Union
+import io
+import os
+import time
+from PIL import Image, ImageChops, ImageFilter, ImageOps
+
+# Set to "false" to hand images to Tesseract unchanged
+PREPROCESS_ENABLED = os.getenv("OCR_PREPROCESS", "true").lower() == "true"
+
+# Tesseract works best around 300 DPI; receipts are roughly 80 mm wide
+TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+RECEIPT_WIDTH_MM = float(os.getenv("OCR_RECEIPT_WIDTH_MM", "80"))
+TARGET_WIDTH = int(TARGET_DPI * RECEIPT_WIDTH_MM / 25.4)
+
+# Adaptive threshold: neighbourhood radius in pixels, and how much darker
+# than its neighbourhood a pixel must be to count as ink
+THRESHOLD_RADIUS = int(os.getenv("OCR_THRESHOLD_RADIUS", "15"))
+THRESHOLD_OFFSET = int(os.getenv("OCR_THRESHOLD_OFFSET", "10"))
+
+# Crop to the bright receipt area when it covers less than this share of the photo
+CROP_MAX_COVERAGE = 0.95
+
+Timings = Dict[str, float]
+
+def preprocess_receipt(source: Union[bytes, str]) -> Tuple[Image.Image, Timings]:
+    """
+    Prepare a receipt photo for OCR. `source` is the image bytes or a file path.
+
+    Stages: decode (JPEGs are decoded at reduced scale when the photo is far
+    larger than needed), EXIF rotation, grayscale, crop to the receipt,
+    downscale to TARGET_WIDTH and adaptive threshold. Returns the image and
+    the time spent in each stage in milliseconds.
+    """
+    timings: Timings = {}
+    started = time.perf_counter()
+
+    def mark(stage: str) -> None:
+        nonlocal started
+        now = time.perf_counter()
+        timings[stage] = round((now - started) * 1000, 2)
+        started = now
+
+    image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    if PREPROCESS_ENABLED and image.format == "JPEG":
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full size;
+        # keep twice the target so cropping still has enough pixels
+        image.draft("L", (TARGET_WIDTH * 2, TARGET_WIDTH * 2))
+    image.load()
+    mark("decode")
+    if not PREPROCESS_ENABLED:
+        return image, timings
+
+    image = ImageOps.exif_transpose(image)
+    mark("rotate")
+
+    image = image.convert("L")
+    mark("grayscale")
+
+    image = crop_to_receipt(image)
+    mark("crop")
+
+    if image.width > TARGET_WIDTH:
+        height = max(1, round(image.height * TARGET_WIDTH / image.width))
+        image = image.resize((TARGET_WIDTH, height), Image.LANCZOS)
+    mark("downscale")
+
+    image = adaptive_threshold(image, THRESHOLD_RADIUS, THRESHOLD_OFFSET)
+    mark("threshold")
+
+    return image, timings
+
+def crop_to_receipt(image: Image.Image) -> Image.Image:
+    """Crop a grayscale photo to the bounding box of its bright paper region."""
+    thumb = image.copy()
+    thumb.thumbnail((256, 256))
+    histogram = thumb.histogram()
+    total = sum(histogram)
+    mean = sum(level * count for level, count in enumerate(histogram)) / total
+
+    mask = thumb.point(lambda v: 255 if v > mean else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return image
+
+    scale_x = image.width / thumb.width
+    scale_y = image.height / thumb.height
+    left, top, right, bottom = (
+        int(bbox[0] * scale_x), int(bbox[1] * scale_y),
+        int(bbox[2] * scale_x), int(bbox[3] * scale_y)
+    )
+    if (right - left) * (bottom - top) >= CROP_MAX_COVERAGE * image.width * image.height:
+        return image
+    return image.crop((left, top, right, bottom))
+
+def adaptive_threshold(image: Image.Image, radius: int, offset: int) -> Image.Image:
+    """
+    Binarize against the local mean, so uneven lighting across the photo
+    does not wash out faint print.
+    """
+    local_mean = image.filter(ImageFilter.BoxBlur(radius))
+    # How much darker each pixel is than its neighbourhood (clipped at 0)
+    darker = ImageChops.subtract(local_mean, image)
+    return darker.point(lambda v: 0 if v > offset else 255)
@@ -0,0 +1,129 @@
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+from pathlib import Path
+from collections import deque
+import os
+import re
+from shared.utils import load_json_file
+from .models import ItemCategory, ItemUnit
+
+KEYWORDS_PATH = os.getenv(
+    "RECEIPT_KEYWORDS_PATH",
+    str(Path(__file__).resolve().parents[2] / "mock_data" / "category_keywords.json")
+)
+
+class KeywordIndex:
+    """
+    Aho-Corasick automaton over category keywords.
+
+    Scanning a name costs O(len(name) + matches) regardless of how many
+    keywords are indexed. Keywords match anywhere in the name, like a
+    substring test, and the category listed first wins when several match.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, int]]):
+        # Node 0 is the root; each node has transitions, a failure link and
+        # the best (lowest) priority of any keyword ending there
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[Optional[int]] = [None]
+        for keyword, priority in keywords:
+            self._add(keyword.lower(), priority)
+        self._build_failure_links()
+
+    def _add(self, keyword: str, priority: int) -> None:
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            node = next_node
+        if self._best[node] is None or priority < self._best[node]:
+            self._best[node] = priority
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                # Inherit matches that end at the failure target
+                inherited = self._best[self._fail[child]]
+                if inherited is not None and (self._best[child] is None or inherited < self._best[child]):
+                    self._best[child] = inherited
+
+    def best_match(self, text: str) -> Optional[int]:
+        """Lowest priority among keywords occurring in text, or None."""
+        best = None
+        node = 0
+        for char in text.lower():
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            priority = self._best[node]
+            if priority is not None and (best is None or priority < best):
+                best = priority
+                if best == 0:
+                    break
+        return best
+
+class ReceiptParser:
+    """Extracts quantity, unit, name and category from receipt text."""
+
+    def __init__(self, categories: Dict[str, List[str]], units: Dict[str, List[str]]):
+        self.categories = [ItemCategory(name) for name in categories]
+        self.keyword_index = KeywordIndex(
+            (keyword, priority)
+            for priority, keywords in enumerate(categories.values())
+            for keyword in keywords
+        )
+
+        self.unit_aliases: Dict[str, ItemUnit] = {unit.value: unit for unit in ItemUnit}
+        for unit, aliases in units.items():
+            for alias in aliases:
+                self.unit_aliases[alias.lower()] = ItemUnit(unit)
+
+        # Longest alias first so "lbs" is not matched as "lb" + "s ..."
+        alternatives = "|".join(
+            re.escape(alias) for alias in sorted(self.unit_aliases, key=len, reverse=True)
+        )
+        # Matches "2 MILK", "1.5 LB APPLES", "3 BOXES CEREAL"; names stay on one line
+        self.pattern = re.compile(
+            r'(\d+\.?\d*)[ \t]*(?:(' + alternatives + r')\.?[ \t]+)?([A-Za-z][A-Za-z \t]*)',
+            re.IGNORECASE
+        )
+
+    @classmethod
+    def from_file(cls, path: str = KEYWORDS_PATH) -> "ReceiptParser":
+        data = load_json_file(path)
+        return cls(data.get("categories", {}), data.get("units", {}))
+
+    def categorize(self, name: str) -> ItemCategory:
+        priority = self.keyword_index.best_match(name)
+        return ItemCategory.OTHER if priority is None else self.categories[priority]
+
+    def parse(self, text: str) -> List[Dict[str, Any]]:
+        items = []
+        for match in self.pattern.finditer(text):
+            name = match.group(3).strip()
+            unit = match.group(2)
+            items.append({
+                "name": name,
+                "quantity": float(match.group(1)),
+                "category": self.categorize(name),
+                "unit": self.unit_aliases[unit.lower()] if unit else ItemUnit.PIECES
+            })
+        return items
+
+try:
+    receipt_parser = ReceiptParser.from_file()
+except FileNotFoundError:
+    print(f"Warning: receipt keywords not found at {KEYWORDS_PATH}, categorization disabled")
+    receipt_parser = ReceiptParser({}, {})
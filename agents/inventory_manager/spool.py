@@ -0,0 +1,44 @@
+from fastapi import UploadFile
+from typing import Optional, Tuple
+import hashlib
+import os
+import tempfile
+
+# Directory for uploaded receipts waiting for OCR; defaults to the system temp dir
+SPOOL_DIR = os.getenv("RECEIPT_SPOOL_DIR") or None
+
+# Bytes read from the upload per copy and hash step
+SPOOL_CHUNK_SIZE = int(os.getenv("RECEIPT_SPOOL_CHUNK_SIZE", str(1024 * 1024)))
+
+async def spool_upload(file: UploadFile, directory: Optional[str] = SPOOL_DIR) -> Tuple[str, str]:
+    """
+    Copy an upload to a named temporary file in chunks, hashing it on the way.
+
+    Starlette already buffers uploads in an unnamed temporary file, which the
+    OCR worker processes cannot open and which is closed when the request
+    ends; the copy gives them a path that lives until remove_spooled.
+
+    Returns the file path and the SHA-256 of its content (the same key as
+    content_hash). The caller removes the file with remove_spooled.
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(prefix="receipt_", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+    except Exception:
+        remove_spooled(path)
+        raise
+    return path, digest.hexdigest()
+
+def remove_spooled(path: str) -> None:
+    """Delete a spooled upload, ignoring files that are already gone."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
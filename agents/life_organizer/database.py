@@ -1,8 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Enum as SQLEnum
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Index, bindparam, inspect, text, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 from .models import ReminderPriority
 
@@ -16,6 +16,10 @@ Base = declarative_base()
 class ReminderDB(Base):
     """Database model for reminders"""
     __tablename__ = "reminders"
+    __table_args__ = (
+        # Serves pending counts and the next pending reminder
+        Index("ix_reminders_completed_due_date", "completed", "due_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), index=True)
@@ -24,20 +28,90 @@ class ReminderDB(Base):
     priority = Column(SQLEnum(ReminderPriority))
     completed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.now)
+    recurrence = Column(String(200), nullable=True)  # RRULE-style; due_date is the first occurrence
 
 class AppointmentDB(Base):
     """Database model for appointments"""
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Lets overlap checks on single appointments filter on both ends
+        # without reading table rows
+        Index("ix_appointments_date_end_time_recurrence", "date", "end_time", "recurrence"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), index=True)
-    date = Column(DateTime, index=True)
+    date = Column(DateTime)  # Leads ix_appointments_date_end_time_recurrence
     duration_minutes = Column(Integer)
+    end_time = Column(DateTime)  # date + duration_minutes
+    recurrence = Column(String(200), nullable=True)  # RRULE-style; date is the first occurrence
+    series_end = Column(DateTime, nullable=True)  # End of the last occurrence; null if unbounded or not recurring
     location = Column(String(200), nullable=True)
     notes = Column(String(500), nullable=True)
 
+# Recurring series are few; partial indexes over just them keep series
+# lookups from scanning single rows, without luring the planner away from
+# the indexes above for single-row queries
+for table, columns in (
+    (ReminderDB.__table__, ("completed", "due_date")),
+    (AppointmentDB.__table__, ("date",))
+):
+    recurring = table.c.recurrence != None
+    Index(
+        f"ix_{table.name}_recurring",
+        *(table.c[name] for name in columns),
+        sqlite_where=recurring,
+        postgresql_where=recurring
+    )
+
+# Columns added after the first release: (table, column, SQL type)
+ADDED_COLUMNS = [
+    ("appointments", "end_time", "DATETIME"),
+    ("appointments", "recurrence", "VARCHAR(200)"),
+    ("appointments", "series_end", "DATETIME"),
+    ("reminders", "recurrence", "VARCHAR(200)"),
+]
+
+def migrate_columns() -> None:
+    """
+    Add columns missing from databases created by older versions, and
+    backfill appointments.end_time.
+    """
+    inspector = inspect(engine)
+    existing = {
+        table: {column["name"] for column in inspector.get_columns(table)}
+        for table in {table for table, _, _ in ADDED_COLUMNS}
+    }
+    with engine.begin() as conn:
+        for table, column, sql_type in ADDED_COLUMNS:
+            if column not in existing[table]:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+        rows = conn.execute(
+            AppointmentDB.__table__.select().with_only_columns(
+                AppointmentDB.id, AppointmentDB.date, AppointmentDB.duration_minutes
+            ).where(AppointmentDB.end_time == None)
+        ).all()
+        if rows:
+            conn.execute(
+                AppointmentDB.__table__.update().where(
+                    AppointmentDB.id == bindparam("row_id")
+                ).values(end_time=bindparam("row_end")),
+                [
+                    {"row_id": row.id, "row_end": row.date + timedelta(minutes=row.duration_minutes or 0)}
+                    for row in rows
+                ]
+            )
+
+def create_missing_indexes() -> None:
+    """create_all skips indexes on tables that already exist."""
+    for table in (ReminderDB.__table__, AppointmentDB.__table__):
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 # Create tables
 Base.metadata.create_all(bind=engine)
+migrate_columns()
+create_missing_indexes()
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -1,12 +1,41 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from .database import get_db, ReminderDB, AppointmentDB
+import asyncio
+import os
+from .database import get_db, SessionLocal, ReminderDB, AppointmentDB
 from .models import ReminderPriority, Reminder, Appointment
+from .scheduling import (
+    find_conflict, busy_intervals, free_windows, planned_intervals, series_end,
+    appointment_occurrences, reminder_occurrences
+)
+from .summary import summary_cache
+from .reminder_scheduler import reminder_scheduler
 
 router = APIRouter()
 
+# Longest range /agenda and /availability expand in one request
+MAX_AGENDA_DAYS = 366
+
+# Seconds between keep-alive comments on an idle reminder stream
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("REMINDER_STREAM_HEARTBEAT_SECONDS", "15"))
+
+@router.on_event("startup")
+def start_reminder_scheduler() -> None:
+    """Load pending reminders and start firing due events."""
+    db = SessionLocal()
+    try:
+        reminder_scheduler.load(db)
+    finally:
+        db.close()
+    reminder_scheduler.start()
+
+@router.on_event("shutdown")
+def stop_reminder_scheduler() -> None:
+    reminder_scheduler.stop()
+
 @router.post("/reminder", response_model=Reminder)
 async def create_reminder(
     reminder: Reminder,
@@ -22,7 +51,9 @@ async def create_reminder(
     db_reminder = ReminderDB(**reminder.dict())
     db.add(db_reminder)
     db.commit()
+    summary_cache.invalidate()
     db.refresh(db_reminder)
+    reminder_scheduler.track(db_reminder)
     return Reminder.from_orm(db_reminder)
 
 @router.get("/reminder", response_model=List[Reminder])
@@ -47,6 +78,37 @@ async def get_reminders(
     reminders = query.limit(limit).all()
     return [Reminder.from_orm(r) for r in reminders]
 
+@router.get("/reminder/stream")
+async def stream_due_reminders(request: Request) -> StreamingResponse:
+    """Stream reminders as server-sent "due" events when their due date arrives."""
+    async def event_stream():
+        # Subscribe inside the generator so the queue is only registered
+        # once the response is streaming, and always released by finally
+        queue = None
+        try:
+            queue = reminder_scheduler.subscribe()
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: due\ndata: {payload}\n\n"
+        finally:
+            if queue is not None:
+                reminder_scheduler.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/reminder/scheduler")
+async def get_reminder_scheduler_status() -> dict:
+    """Get the number of scheduled reminders, the next due date and stream subscribers."""
+    return reminder_scheduler.status()
+
 @router.post("/appointment", response_model=Appointment)
 async def book_appointment(
     appointment: Appointment,
@@ -59,22 +121,17 @@ async def book_appointment(
             detail="Appointment date cannot be in the past"
         )
     
-    # Check for conflicts with more precise timing
-    appointment_end = appointment.date.replace(
-        minute=appointment.date.minute + appointment.duration_minutes
-    )
-    
-    # Query for conflicting appointments
-    conflicts = db.query(AppointmentDB).filter(
-        (
-            (AppointmentDB.date <= appointment.date) &
-            (AppointmentDB.date.op('+').__call__(AppointmentDB.duration_minutes * 60) > appointment.date)
-        ) |
-        (
-            (AppointmentDB.date < appointment_end) &
-            (AppointmentDB.date.op('+').__call__(AppointmentDB.duration_minutes * 60) >= appointment_end)
+    if appointment.date > datetime.max - timedelta(minutes=appointment.duration_minutes):
+        raise HTTPException(
+            status_code=400,
+            detail="Appointment cannot end after the year 9999"
         )
-    ).first()
+    
+    appointment_end = appointment.date + timedelta(minutes=appointment.duration_minutes)
+    # A recurring appointment is checked occurrence by occurrence up to the conflict horizon
+    conflicts = find_conflict(db, planned_intervals(
+        appointment.date, appointment.duration_minutes, appointment.recurrence
+    ))
     
     if conflicts:
         raise HTTPException(
@@ -82,36 +139,88 @@ async def book_appointment(
             detail="Scheduling conflict: Another appointment exists during this time"
         )
     
-    db_appointment = AppointmentDB(**appointment.dict())
+    db_appointment = AppointmentDB(
+        **appointment.dict(),
+        end_time=appointment_end,
+        series_end=series_end(appointment.date, appointment.duration_minutes, appointment.recurrence)
+    )
     db.add(db_appointment)
     db.commit()
+    summary_cache.invalidate()
     db.refresh(db_appointment)
     return Appointment.from_orm(db_appointment)
 
-@router.get("/summary")
-async def get_summary(db: Session = Depends(get_db)) -> dict:
-    """Get a summary of current tasks and appointments."""
-    now = datetime.now()
-    
-    # Get pending reminders
-    pending_reminders = db.query(ReminderDB).filter(
-        ReminderDB.completed == False
-    ).order_by(ReminderDB.due_date).all()
+@router.get("/availability")
+async def get_availability(
+    start: datetime,
+    end: datetime,
+    duration_minutes: int = Query(..., gt=0, description="Length of the slot needed"),
+    limit: Optional[int] = Query(None, gt=0, description="Return only the first free windows"),
+    db: Session = Depends(get_db)
+) -> dict:
+    """
+    Find free windows of at least the given length between start and end.
+
+    Busy time is read lazily, so with a limit the scan stops at the last
+    window returned.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="End must be after start")
+    if end - start > timedelta(days=MAX_AGENDA_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_AGENDA_DAYS} days")
     
-    # Get upcoming appointments
-    upcoming_appointments = db.query(AppointmentDB).filter(
-        AppointmentDB.date >= now
-    ).order_by(AppointmentDB.date).all()
+    busy = busy_intervals(db, start, end)
+    windows = free_windows(busy, start, end, timedelta(minutes=duration_minutes), limit)
+    return {
+        "start": start,
+        "end": end,
+        "duration_minutes": duration_minutes,
+        "free": [{"start": s, "end": e} for s, e in windows]
+    }
+
+@router.get("/agenda")
+async def get_agenda(
+    start: datetime,
+    end: datetime,
+    db: Session = Depends(get_db)
+) -> dict:
+    """List appointment and pending reminder occurrences between start and end, recurring ones expanded."""
+    if end <= start:
+        raise HTTPException(status_code=400, detail="End must be after start")
+    if end - start > timedelta(days=MAX_AGENDA_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_AGENDA_DAYS} days")
     
     return {
-        "pending_reminders_count": len(pending_reminders),
-        "upcoming_appointments_count": len(upcoming_appointments),
-        "high_priority_reminders": len([r for r in pending_reminders if r.priority == ReminderPriority.HIGH]),
-        "next_reminder": Reminder.from_orm(pending_reminders[0]).dict() if pending_reminders else None,
-        "next_appointment": Appointment.from_orm(upcoming_appointments[0]).dict() if upcoming_appointments else None,
-        "overdue_reminders": len([r for r in pending_reminders if r.due_date < now])
+        "start": start,
+        "end": end,
+        "appointments": [
+            {
+                "id": row.id,
+                "title": row.title,
+                "start": occurrence_start,
+                "end": occurrence_end,
+                "location": row.location,
+                "recurring": row.recurrence is not None
+            }
+            for occurrence_start, occurrence_end, row in appointment_occurrences(db, start, end, full_rows=True)
+        ],
+        "reminders": [
+            {
+                "id": row.id,
+                "title": row.title,
+                "due_date": due,
+                "priority": row.priority,
+                "recurring": row.recurrence is not None
+            }
+            for due, _, row in reminder_occurrences(db, start, end)
+        ]
     }
 
+@router.get("/summary")
+async def get_summary(db: Session = Depends(get_db)) -> dict:
+    """Get a summary of current tasks and appointments."""
+    return summary_cache.get(db)
+
 @router.put("/reminder/{reminder_id}/complete")
 async def complete_reminder(
     reminder_id: int,
@@ -124,6 +233,8 @@ async def complete_reminder(
     
     reminder.completed = True
     db.commit()
+    summary_cache.invalidate()
+    reminder_scheduler.untrack(reminder_id)
     return {"message": "Reminder marked as completed"}
 
 @router.delete("/reminder/{reminder_id}")
@@ -138,6 +249,8 @@ async def delete_reminder(
     
     db.delete(reminder)
     db.commit()
+    summary_cache.invalidate()
+    reminder_scheduler.untrack(reminder_id)
     return {"message": "Reminder deleted"}
 
 @router.delete("/appointment/{appointment_id}")
@@ -150,11 +263,14 @@ async def cancel_appointment(
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
-    if appointment.date < datetime.now():
+    # A recurring appointment can be cancelled until its last occurrence has ended
+    last_end = appointment.series_end if appointment.recurrence else appointment.date
+    if last_end is not None and last_end < datetime.now():
         raise HTTPException(status_code=400, detail="Cannot cancel past appointments")
     
     db.delete(appointment)
     db.commit()
+    summary_cache.invalidate()
     return {"message": "Appointment cancelled"}
 
 # Stretch feature placeholders
@@ -1,13 +1,23 @@
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 from datetime import datetime
+from .recurrence import parse_rule
+
+# Longest appointment accepted; conflict checks look back this far
+MAX_APPOINTMENT_MINUTES = 480  # 8 hours
 
 class ReminderPriority(str, Enum):
     LOW = "low"
     MEDIUM = "medium"
     HIGH = "high"
 
+def validate_recurrence(value: Optional[str]) -> Optional[str]:
+    """Reject rules the recurrence module cannot expand."""
+    if value:
+        parse_rule(value)
+    return value or None
+
 class Reminder(BaseModel):
     title: str = Field(..., min_length=1, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
@@ -15,6 +25,9 @@ class Reminder(BaseModel):
     priority: ReminderPriority = ReminderPriority.MEDIUM
     completed: bool = False
     created_at: datetime = Field(default_factory=datetime.now)
+    recurrence: Optional[str] = Field(None, max_length=200)  # e.g. "FREQ=WEEKLY;BYDAY=MO"
+    
+    _check_recurrence = field_validator("recurrence")(validate_recurrence)
     
     class Config:
         json_schema_extra = {
@@ -30,9 +43,12 @@ class Reminder(BaseModel):
 class Appointment(BaseModel):
     title: str = Field(..., min_length=1, max_length=100)
     date: datetime
-    duration_minutes: int = Field(..., gt=0, le=480)  # Max 8 hours
+    duration_minutes: int = Field(..., gt=0, le=MAX_APPOINTMENT_MINUTES)
     location: Optional[str] = Field(None, max_length=200)
     notes: Optional[str] = Field(None, max_length=500)
+    recurrence: Optional[str] = Field(None, max_length=200)  # e.g. "FREQ=DAILY;COUNT=5"
+    
+    _check_recurrence = field_validator("recurrence")(validate_recurrence)
     
     class Config:
         json_schema_extra = {
@@ -0,0 +1,248 @@
+"""
+RRULE-style recurrence for reminders and appointments.
+
+Rules use a subset of RFC 5545 RRULE syntax:
+
+    FREQ=DAILY;INTERVAL=2;COUNT=10
+    FREQ=WEEKLY;BYDAY=MO,WE,FR;UNTIL=2025-06-30T00:00:00
+    FREQ=MONTHLY
+
+FREQ is DAILY, WEEKLY or MONTHLY. INTERVAL defaults to 1. COUNT and UNTIL
+(inclusive, ISO 8601 or YYYYMMDD[THHMMSS]) bound the series; without either
+it repeats forever. BYDAY is only allowed with WEEKLY. Monthly rules skip
+months without the start day, like RRULE.
+
+Occurrences are never stored. occurrences() yields them lazily for a
+window, jumping straight to the window for daily and weekly rules, so the
+cost depends on the window rather than on how long the series has run.
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterator, List, Optional
+import calendar
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+# Longest bounded series accepted; keeps series_end cheap for monthly rules
+MAX_COUNT = 10000
+
+class RecurrenceError(ValueError):
+    """Raised when a recurrence rule is invalid."""
+
+def _parse_until(value: str) -> datetime:
+    for fmt in ("%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            return datetime.strptime(value.rstrip("Z"), fmt)
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(value.rstrip("Z"))
+    except ValueError:
+        raise RecurrenceError(f"Invalid UNTIL '{value}'")
+
+class RecurrenceRule:
+    """A parsed recurrence rule; see the module docstring for the syntax."""
+
+    def __init__(
+        self,
+        freq: str,
+        interval: int = 1,
+        count: Optional[int] = None,
+        until: Optional[datetime] = None,
+        byday: Optional[List[int]] = None
+    ):
+        if freq not in FREQUENCIES:
+            raise RecurrenceError(f"Unsupported FREQ '{freq}'")
+        if interval < 1:
+            raise RecurrenceError("INTERVAL must be at least 1")
+        if count is not None and not 1 <= count <= MAX_COUNT:
+            raise RecurrenceError(f"COUNT must be between 1 and {MAX_COUNT}")
+        if byday and freq != "WEEKLY":
+            raise RecurrenceError("BYDAY is only supported with FREQ=WEEKLY")
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.byday = sorted(set(byday)) if byday else None
+
+    @classmethod
+    def parse(cls, text: str) -> "RecurrenceRule":
+        parts = {}
+        for part in text.upper().replace("RRULE:", "").split(";"):
+            if not part:
+                continue
+            key, sep, value = part.partition("=")
+            if not sep:
+                raise RecurrenceError(f"Invalid rule part '{part}'")
+            parts[key] = value
+
+        try:
+            freq = parts.pop("FREQ")
+        except KeyError:
+            raise RecurrenceError("Rule is missing FREQ")
+        try:
+            interval = int(parts.pop("INTERVAL", "1"))
+            count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+        except ValueError as e:
+            raise RecurrenceError(str(e))
+        until = _parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else None
+        byday = None
+        if "BYDAY" in parts:
+            try:
+                byday = [WEEKDAYS[day] for day in parts.pop("BYDAY").split(",")]
+            except KeyError as e:
+                raise RecurrenceError(f"Invalid BYDAY {e}")
+        if parts:
+            raise RecurrenceError(f"Unsupported rule parts: {', '.join(sorted(parts))}")
+        return cls(freq, interval, count, until, byday)
+
+    def occurrences(
+        self,
+        dtstart: datetime,
+        window_start: Optional[datetime] = None,
+        window_end: Optional[datetime] = None
+    ) -> Iterator[datetime]:
+        """Yield occurrence starts with window_start <= start < window_end, in order."""
+        if self.freq == "DAILY":
+            candidates = self._daily(dtstart, window_start)
+        elif self.freq == "WEEKLY":
+            candidates = self._weekly(dtstart, window_start)
+        else:
+            candidates = self._monthly(dtstart)
+
+        for index, start in candidates:
+            if self.count is not None and index >= self.count:
+                return
+            if self.until is not None and start > self.until:
+                return
+            if window_end is not None and start >= window_end:
+                return
+            if window_start is None or start >= window_start:
+                yield start
+
+    def next_after(self, dtstart: datetime, moment: datetime) -> Optional[datetime]:
+        """First occurrence at or after `moment`, or None if the series has ended."""
+        return next(self.occurrences(dtstart, moment), None)
+
+    def last(self, dtstart: datetime) -> Optional[datetime]:
+        """
+        Last occurrence of a bounded series; None if it repeats forever.
+
+        Computed from the COUNT-th occurrence and the last one on or before
+        UNTIL without walking the series, so far-off bounds cost the same as
+        near ones. Series running past datetime.max end at the last
+        occurrence it can represent.
+        """
+        if self.count is None and self.until is None:
+            return None
+        bound = self.until or datetime.max
+        if self.count is not None:
+            nth = self._nth(dtstart, self.count - 1)
+            if nth is not None and nth <= bound:
+                return nth
+        return self._last_before(dtstart, bound)
+
+    def _nth(self, dtstart: datetime, index: int) -> Optional[datetime]:
+        """Occurrence number `index` (0-based) ignoring COUNT and UNTIL; None past datetime.max."""
+        try:
+            if self.freq == "DAILY":
+                return dtstart + index * timedelta(days=self.interval)
+            if self.freq == "WEEKLY":
+                days = self.byday or [dtstart.weekday()]
+                skipped = sum(1 for day in days if day < dtstart.weekday())
+                period, position = divmod(index + skipped, len(days))
+                week_start = dtstart - timedelta(days=dtstart.weekday())
+                return week_start + timedelta(weeks=period * self.interval, days=days[position])
+        except OverflowError:
+            return None
+        # Monthly rules skip months without the start day; COUNT keeps this short
+        for candidate_index, start in self._monthly(dtstart):
+            if candidate_index == index:
+                return start
+        return None
+
+    def _last_before(self, dtstart: datetime, bound: datetime) -> Optional[datetime]:
+        """Last occurrence on or before `bound`, ignoring COUNT."""
+        if bound < dtstart:
+            return None
+        if self.freq == "DAILY":
+            step = timedelta(days=self.interval)
+            return dtstart + (bound - dtstart) // step * step
+
+        if self.freq == "WEEKLY":
+            days = self.byday or [dtstart.weekday()]
+            week_start = dtstart - timedelta(days=dtstart.weekday())
+            period = (bound - week_start).days // (7 * self.interval)
+            for period in range(period, -1, -1):
+                base = week_start + timedelta(weeks=period * self.interval)
+                for day in reversed(days):
+                    try:
+                        start = base + timedelta(days=day)
+                    except OverflowError:
+                        continue
+                    if start < dtstart:
+                        return None
+                    if start <= bound:
+                        return start
+            return None
+
+        months = (bound.year - dtstart.year) * 12 + bound.month - dtstart.month
+        for months in range(months - months % self.interval, -1, -self.interval):
+            total = dtstart.month - 1 + months
+            year, month = dtstart.year + total // 12, total % 12 + 1
+            if dtstart.day <= calendar.monthrange(year, month)[1]:
+                start = dtstart.replace(year=year, month=month)
+                if start <= bound:
+                    return start
+        return None
+
+    def _daily(self, dtstart: datetime, window_start: Optional[datetime]) -> Iterator[tuple]:
+        step = timedelta(days=self.interval)
+        index = 0
+        if window_start and window_start > dtstart:
+            index = -(-(window_start - dtstart) // step)  # Ceiling division
+        while True:
+            try:
+                start = dtstart + index * step
+            except OverflowError:
+                return
+            yield index, start
+            index += 1
+
+    def _weekly(self, dtstart: datetime, window_start: Optional[datetime]) -> Iterator[tuple]:
+        days = self.byday or [dtstart.weekday()]
+        week_start = dtstart - timedelta(days=dtstart.weekday())
+        # Occurrences lost in the first week because they fall before dtstart
+        skipped = sum(1 for day in days if day < dtstart.weekday())
+        period = 0
+        if window_start and window_start > dtstart:
+            period = max(0, (window_start - week_start).days // (7 * self.interval) - 1)
+        while True:
+            for position, day in enumerate(days):
+                try:
+                    start = week_start + timedelta(weeks=period * self.interval, days=day)
+                except OverflowError:
+                    return
+                if start < dtstart:
+                    continue
+                yield period * len(days) + position - skipped, start
+            period += 1
+
+    def _monthly(self, dtstart: datetime) -> Iterator[tuple]:
+        index = 0
+        months = 0
+        while True:
+            total = dtstart.month - 1 + months
+            year, month = dtstart.year + total // 12, total % 12 + 1
+            if year > 9999:
+                return
+            if dtstart.day <= calendar.monthrange(year, month)[1]:
+                yield index, dtstart.replace(year=year, month=month)
+                index += 1
+            months += self.interval
+
+@lru_cache(maxsize=1024)
+def parse_rule(text: str) -> RecurrenceRule:
+    """Parse a rule string, caching the result for repeated expansion."""
+    return RecurrenceRule.parse(text)
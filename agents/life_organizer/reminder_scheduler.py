@@ -0,0 +1,180 @@
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import heapq
+import json
+import os
+from .database import ReminderDB
+from .recurrence import RecurrenceRule, parse_rule
+
+# Due events buffered per stream subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("REMINDER_STREAM_QUEUE_SIZE", "100"))
+
+class ReminderScheduler:
+    """
+    Fires "due" events for pending reminders when their due date arrives.
+
+    Pending reminders sit in one min-heap ordered by due date, served by a
+    single asyncio task that sleeps until the earliest one, so thousands of
+    reminders cost one timer. The heap is loaded once at startup and kept
+    current by the reminder endpoints; completed or deleted reminders leave
+    stale entries that are skipped when they reach the top. A recurring
+    reminder holds one entry for its next occurrence, replaced by the
+    following one when it fires.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._heap: List[Tuple[datetime, int]] = []
+        self._pending: Dict[int, Dict[str, Any]] = {}  # Reminder id -> event payload
+        self._series: Dict[int, Tuple[RecurrenceRule, datetime]] = {}  # Recurring id -> (rule, first due)
+        self._subscribers: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.fired = 0
+
+    def load(self, db: Session) -> int:
+        """Track every pending reminder with an occurrence still to come. Returns the number tracked."""
+        now = datetime.now()
+        reminders = db.query(ReminderDB).filter(
+            ReminderDB.completed == False,
+            (ReminderDB.due_date >= now) | (ReminderDB.recurrence != None)
+        ).all()
+        self._pending = {}
+        self._series = {}
+        self._heap = []
+        for reminder in reminders:
+            self._schedule(reminder, now)
+        heapq.heapify(self._heap)
+        self._wake()
+        return len(self._pending)
+
+    def track(self, reminder: ReminderDB) -> None:
+        """Schedule a reminder, replacing any earlier schedule for the same id."""
+        self.untrack(reminder.id)
+        if reminder.completed:
+            return
+        if self._schedule(reminder, datetime.now(), push=True):
+            if len(self._heap) > 2 * len(self._pending) + 64:
+                # Rebuild once stale entries outnumber live ones
+                self._heap = [
+                    (datetime.fromisoformat(payload["due_date"]), reminder_id)
+                    for reminder_id, payload in self._pending.items()
+                ]
+                heapq.heapify(self._heap)
+            self._wake()
+
+    def _schedule(self, reminder: ReminderDB, now: datetime, push: bool = False) -> bool:
+        """Add the reminder's next due time at or after `now`, if it has one."""
+        due = reminder.due_date
+        if reminder.recurrence:
+            rule = parse_rule(reminder.recurrence)
+            self._series[reminder.id] = (rule, reminder.due_date)
+            due = rule.next_after(reminder.due_date, now)
+            if due is None:
+                self._series.pop(reminder.id)
+                return False
+        elif due < now:
+            return False
+        self._pending[reminder.id] = self._payload(reminder, due)
+        if push:
+            heapq.heappush(self._heap, (due, reminder.id))
+        else:
+            self._heap.append((due, reminder.id))
+        return True
+
+    def untrack(self, reminder_id: int) -> None:
+        self._pending.pop(reminder_id, None)
+        self._series.pop(reminder_id, None)
+
+    def subscribe(self) -> "asyncio.Queue[str]":
+        queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: "asyncio.Queue[str]") -> None:
+        self._subscribers.discard(queue)
+
+    def status(self) -> Dict[str, Any]:
+        entry = self._next()
+        return {
+            "running": bool(self._task and not self._task.done()),
+            "pending": len(self._pending),
+            "next_due": entry[0] if entry else None,
+            "subscribers": len(self._subscribers),
+            "fired": self.fired
+        }
+
+    def start(self) -> None:
+        """Start the timer task on the running event loop."""
+        if self._task and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    @staticmethod
+    def _payload(reminder: ReminderDB, due: datetime) -> Dict[str, Any]:
+        return {
+            "reminder_id": reminder.id,
+            "title": reminder.title,
+            "description": reminder.description,
+            "priority": reminder.priority.value if reminder.priority else None,
+            "due_date": due.isoformat(),
+            "recurring": reminder.recurrence is not None
+        }
+
+    def _wake(self) -> None:
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _next(self) -> Optional[Tuple[datetime, int]]:
+        """Earliest live heap entry, discarding stale ones above it."""
+        while self._heap:
+            due_date, reminder_id = self._heap[0]
+            payload = self._pending.get(reminder_id)
+            if payload and payload["due_date"] == due_date.isoformat():
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    async def _run(self) -> None:
+        while True:
+            entry = self._next()
+            timeout = None
+            if entry:
+                timeout = (entry[0] - datetime.now()).total_seconds()
+                if timeout <= 0:
+                    heapq.heappop(self._heap)
+                    self._fire(entry[1], self._pending.pop(entry[1]), entry[0])
+                    continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _fire(self, reminder_id: int, payload: Dict[str, Any], due: datetime) -> None:
+        self.fired += 1
+        message = json.dumps(payload)
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+        series = self._series.get(reminder_id)
+        if series:
+            rule, first_due = series
+            next_due = rule.next_after(first_due, due + timedelta(microseconds=1))
+            if next_due is None:
+                del self._series[reminder_id]
+                return
+            self._pending[reminder_id] = {**payload, "due_date": next_due.isoformat()}
+            heapq.heappush(self._heap, (next_due, reminder_id))
+
+reminder_scheduler = ReminderScheduler()
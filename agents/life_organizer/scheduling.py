@@ -0,0 +1,198 @@
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+import heapq
+import os
+from .database import AppointmentDB, ReminderDB
+from .models import MAX_APPOINTMENT_MINUTES
+from .recurrence import parse_rule
+
+# No appointment starts earlier than this before another one ends
+MAX_APPOINTMENT_LENGTH = timedelta(minutes=MAX_APPOINTMENT_MINUTES)
+
+# New recurring appointments are checked for conflicts this far ahead
+CONFLICT_HORIZON_DAYS = int(os.getenv("APPOINTMENT_CONFLICT_HORIZON_DAYS", "365"))
+
+Interval = Tuple[datetime, datetime]
+
+# (start, end, row) of one appointment or reminder occurrence
+Occurrence = Tuple[datetime, datetime, Any]
+
+def overlapping_appointments(db: Session, start: datetime, end: datetime, *columns):
+    """
+    Query single (non-recurring) appointments overlapping [start, end),
+    ordered by start.
+
+    Appointments are at most MAX_APPOINTMENT_LENGTH long, so only those
+    starting in (start - MAX_APPOINTMENT_LENGTH, end) can overlap. That
+    bounds the scan on the (date, end_time) index to O(log n + k). Pass
+    columns to select only those instead of whole rows.
+    """
+    return db.query(*(columns or (AppointmentDB,))).filter(
+        AppointmentDB.date > start - MAX_APPOINTMENT_LENGTH,
+        AppointmentDB.date < end,
+        AppointmentDB.end_time > start,
+        AppointmentDB.recurrence == None
+    ).order_by(AppointmentDB.date)
+
+def recurring_appointments(db: Session, start: datetime, end: datetime, *columns):
+    """Query recurring appointment series that may have occurrences in [start, end)."""
+    return db.query(*(columns or (AppointmentDB,))).filter(
+        AppointmentDB.recurrence != None,
+        AppointmentDB.date < end,
+        (AppointmentDB.series_end == None) | (AppointmentDB.series_end > start)
+    )
+
+def expand_appointment(row: Any, start: datetime, end: datetime) -> Iterator[Occurrence]:
+    """Lazily yield the occurrences of a recurring appointment overlapping [start, end)."""
+    duration = timedelta(minutes=row.duration_minutes)
+    for occurrence in parse_rule(row.recurrence).occurrences(row.date, start - duration, end):
+        try:
+            occurrence_end = occurrence + duration
+        except OverflowError:
+            # Runs past datetime.max; nothing later can be represented
+            return
+        if occurrence_end > start:
+            yield occurrence, occurrence_end, row
+
+def appointment_occurrences(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    full_rows: bool = False
+) -> Iterator[Occurrence]:
+    """
+    Single appointments and expanded recurring ones overlapping [start, end),
+    merged in start order. Without full_rows only the columns needed for
+    the interval are read, so single appointments come from the index alone.
+    """
+    if full_rows:
+        single_columns, series_columns = (AppointmentDB,), (AppointmentDB,)
+    else:
+        single_columns = (AppointmentDB.date, AppointmentDB.end_time)
+        series_columns = (AppointmentDB.date, AppointmentDB.duration_minutes, AppointmentDB.recurrence)
+
+    single = (
+        (row.date, row.end_time, row)
+        for row in overlapping_appointments(db, start, end, *single_columns)
+    )
+    series = [
+        expand_appointment(row, start, end)
+        for row in recurring_appointments(db, start, end, *series_columns)
+    ]
+    return heapq.merge(single, *series, key=lambda occurrence: occurrence[:2])
+
+def busy_intervals(db: Session, start: datetime, end: datetime) -> Iterator[Interval]:
+    """Lazily yield (start, end) of appointment occurrences overlapping the range, ordered by start."""
+    return ((s, e) for s, e, _ in appointment_occurrences(db, start, end))
+
+def planned_intervals(
+    date: datetime,
+    duration_minutes: int,
+    recurrence: Optional[str] = None
+) -> List[Interval]:
+    """Intervals a new appointment would occupy, up to CONFLICT_HORIZON_DAYS for a series."""
+    duration = timedelta(minutes=duration_minutes)
+    if not recurrence:
+        return [(date, date + duration)]
+    horizon = date + min(timedelta(days=CONFLICT_HORIZON_DAYS), datetime.max - date)
+    return [
+        (occurrence, occurrence + duration)
+        for occurrence in parse_rule(recurrence).occurrences(date, date, horizon)
+        if occurrence <= datetime.max - duration
+    ]
+
+def series_end(date: datetime, duration_minutes: int, recurrence: Optional[str]) -> Optional[datetime]:
+    """End of the last occurrence of a bounded series; None if unbounded or not recurring."""
+    if not recurrence:
+        return None
+    last = parse_rule(recurrence).last(date)
+    if last is None:
+        return None
+    try:
+        return last + timedelta(minutes=duration_minutes)
+    except OverflowError:
+        return datetime.max
+
+def merge_intervals(intervals: Iterable[Interval]) -> Iterator[Interval]:
+    """Merge intervals ordered by start into disjoint ones, in one pass."""
+    current: Optional[Interval] = None
+    for start, end in intervals:
+        if current and start <= current[1]:
+            current = (current[0], max(current[1], end))
+            continue
+        if current:
+            yield current
+        current = (start, end)
+    if current:
+        yield current
+
+def find_conflict(db: Session, intervals: List[Interval]) -> Optional[Interval]:
+    """
+    Return a busy interval overlapping any of `intervals` (ordered, disjoint),
+    if any. Existing appointments are read once for the whole span and
+    compared with a two-pointer sweep.
+    """
+    if not intervals:
+        return None
+    busy = merge_intervals(busy_intervals(db, intervals[0][0], intervals[-1][1]))
+    candidate = next(busy, None)
+    for start, end in intervals:
+        while candidate and candidate[1] <= start:
+            candidate = next(busy, None)
+        if candidate is None:
+            return None
+        if candidate[0] < end:
+            return candidate
+    return None
+
+def free_windows(
+    busy: Iterable[Interval],
+    start: datetime,
+    end: datetime,
+    duration: timedelta,
+    limit: Optional[int] = None
+) -> List[Interval]:
+    """
+    Gaps of at least `duration` in [start, end) between busy intervals.
+
+    `busy` must be ordered by start; overlapping intervals are merged in the
+    same single pass.
+    """
+    windows: List[Interval] = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start - cursor >= duration:
+            windows.append((cursor, min(busy_start, end)))
+            if limit and len(windows) >= limit:
+                return windows
+        cursor = max(cursor, busy_end)
+        if cursor >= end:
+            return windows
+    if end - cursor >= duration:
+        windows.append((cursor, end))
+    return windows
+
+def expand_reminder(row: Any, start: datetime, end: datetime) -> Iterator[Occurrence]:
+    """Lazily yield the due times of a recurring reminder in [start, end)."""
+    for due in parse_rule(row.recurrence).occurrences(row.due_date, start, end):
+        yield due, due, row
+
+def reminder_occurrences(db: Session, start: datetime, end: datetime) -> Iterator[Occurrence]:
+    """Due times of pending reminders in [start, end), recurring ones expanded, in order."""
+    single = (
+        (row.due_date, row.due_date, row) for row in db.query(ReminderDB).filter(
+            ReminderDB.completed == False,
+            ReminderDB.due_date >= start,
+            ReminderDB.due_date < end,
+            ReminderDB.recurrence == None
+        ).order_by(ReminderDB.due_date)
+    )
+    series = [
+        expand_reminder(row, start, end) for row in db.query(ReminderDB).filter(
+            ReminderDB.completed == False,
+            ReminderDB.recurrence != None,
+            ReminderDB.due_date < end
+        )
+    ]
+    return heapq.merge(single, *series, key=lambda occurrence: occurrence[0])
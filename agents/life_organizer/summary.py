@@ -0,0 +1,112 @@
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+import os
+import threading
+import time
+from .database import ReminderDB, AppointmentDB
+from .models import ReminderPriority, Reminder, Appointment
+from .recurrence import parse_rule
+from .scheduling import recurring_appointments
+
+# Seconds a summary is served from memory; writes in this process clear it sooner
+SUMMARY_TTL_SECONDS = float(os.getenv("ORGANIZER_SUMMARY_TTL_SECONDS", "5"))
+
+# Recurring appointments count their occurrences within this many days as upcoming
+UPCOMING_WINDOW_DAYS = float(os.getenv("ORGANIZER_UPCOMING_WINDOW_DAYS", "30"))
+
+def compute_summary(db: Session) -> Dict[str, Any]:
+    """
+    Build the dashboard summary with one aggregate query and two LIMIT 1
+    lookups, so the cost does not grow with the number of rows returned.
+
+    Recurring series are expanded lazily: they add their occurrences in the
+    next UPCOMING_WINDOW_DAYS to the upcoming count and their next
+    occurrence competes for next reminder/appointment. A recurring reminder
+    is never overdue.
+    """
+    now = datetime.now()
+    pending = ReminderDB.completed == False
+    single = ReminderDB.recurrence == None
+
+    counts = db.execute(
+        select(
+            func.count(case((pending, 1))),
+            func.count(case((pending & (ReminderDB.priority == ReminderPriority.HIGH), 1))),
+            func.count(case((pending & single & (ReminderDB.due_date < now), 1))),
+            select(func.count()).select_from(AppointmentDB).where(
+                AppointmentDB.date >= now,
+                AppointmentDB.recurrence == None
+            ).scalar_subquery()
+        ).select_from(ReminderDB)
+    ).one()
+    pending_count, high_priority_count, overdue_count, upcoming_count = counts
+
+    next_reminder = db.query(ReminderDB).filter(pending, single).order_by(ReminderDB.due_date).first()
+    next_due = next_reminder.due_date if next_reminder else None
+    for row in db.query(ReminderDB).filter(pending, ReminderDB.recurrence != None):
+        due = parse_rule(row.recurrence).next_after(row.due_date, now)
+        if due and (next_due is None or due < next_due):
+            next_reminder, next_due = row, due
+
+    next_appointment = db.query(AppointmentDB).filter(
+        AppointmentDB.date >= now,
+        AppointmentDB.recurrence == None
+    ).order_by(AppointmentDB.date).first()
+    next_start = next_appointment.date if next_appointment else None
+    window_end = now + timedelta(days=UPCOMING_WINDOW_DAYS)
+    for row in recurring_appointments(db, now, datetime.max):
+        rule = parse_rule(row.recurrence)
+        first = rule.next_after(row.date, now)
+        if first is None:
+            continue
+        upcoming_count += sum(1 for _ in rule.occurrences(row.date, now, window_end))
+        if next_start is None or first < next_start:
+            next_appointment, next_start = row, first
+
+    return {
+        "pending_reminders_count": pending_count,
+        "upcoming_appointments_count": upcoming_count,
+        "high_priority_reminders": high_priority_count,
+        "next_reminder": Reminder.from_orm(next_reminder).dict() | {"due_date": next_due} if next_reminder else None,
+        "next_appointment": Appointment.from_orm(next_appointment).dict() | {"date": next_start} if next_appointment else None,
+        "overdue_reminders": overdue_count
+    }
+
+class SummaryCache:
+    """
+    Holds the last computed summary for SUMMARY_TTL_SECONDS.
+
+    Write endpoints call invalidate(). A summary computed while a write was
+    in progress is not stored, because the generation it started from no
+    longer matches.
+    """
+
+    def __init__(self, ttl_seconds: float = SUMMARY_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._summary: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._generation = 0
+
+    def get(self, db: Session) -> Dict[str, Any]:
+        """Return the cached summary, computing it if missing or expired."""
+        with self._lock:
+            if self._summary is not None and time.monotonic() < self._expires_at:
+                return self._summary
+            generation = self._generation
+
+        summary = compute_summary(db)
+        with self._lock:
+            if generation == self._generation:
+                self._summary = summary
+                self._expires_at = time.monotonic() + self.ttl_seconds
+        return summary
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._summary = None
+
+summary_cache = SummaryCache()
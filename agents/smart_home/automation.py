@@ -0,0 +1,336 @@
+"""
+Declarative automation rules for the smart home.
+
+Rules are loaded from a JSON file (see mock_data/automation_rules.json) and
+compiled once. Each rule has a trigger, conditions and actions:
+
+    {
+        "name": "arrival_lights",
+        "trigger": {"type": "arrival"},
+        "conditions": [
+            {"key": "context.auto_lights", "op": "eq", "value": true},
+            {"key": "lights.*", "op": "eq", "value": "off", "match": "all"}
+        ],
+        "actions": [
+            {"type": "set", "key": "lights.living_room", "value": "on"},
+            {"type": "report", "message": "turned on main lights"}
+        ]
+    }
+
+Triggers are "arrival", "state_change" (optionally with a "key" such as
+"temperature.*"; otherwise the keys its conditions read) and "time" (with
+"at": "HH:MM"). Condition keys are "context.<name>", "<section>.<key>" or
+"<section>.<key>.<field>", where <key> may be "*". Wildcard conditions
+match "all" (default), "any" or "each" key; actions of an "each" rule run
+once per matching key and may use {key} and {name} in messages.
+
+Action types are "set" (change state), "report" (an update made),
+"attention" (something the user should look at) and "announce" (speak a
+message).
+"""
+from typing import Dict, Any, Optional, List, Callable, Tuple
+from pathlib import Path
+import copy
+import operator
+import os
+import threading
+from shared.utils import load_json_file
+
+RULES_PATH = os.getenv(
+    "AUTOMATION_RULES_PATH",
+    str(Path(__file__).resolve().parents[2] / "mock_data" / "automation_rules.json")
+)
+
+# Maximum rounds of state-change rules triggered by other rules' changes
+MAX_CASCADE_DEPTH = 5
+
+State = Dict[str, Dict[str, Any]]
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "in": lambda actual, expected: actual in expected
+}
+
+class AutomationError(ValueError):
+    """Raised when a rule definition is invalid."""
+
+class AutomationResult:
+    """Accumulated outcome of evaluating one or more rules."""
+
+    def __init__(self):
+        self.changes: State = {}
+        self.updates: List[str] = []
+        self.attention: List[str] = []
+        self.announcements: List[str] = []
+        self.fired: List[str] = []
+
+    def merge(self, other: "AutomationResult") -> None:
+        for section, section_changes in other.changes.items():
+            self.changes.setdefault(section, {}).update(section_changes)
+        self.updates.extend(other.updates)
+        self.attention.extend(other.attention)
+        self.announcements.extend(other.announcements)
+        self.fired.extend(other.fired)
+
+def _parse_key(key: str) -> Tuple[str, str, Optional[str]]:
+    """Split a state key into (section, key, field)."""
+    parts = key.split(".")
+    if len(parts) == 2:
+        return parts[0], parts[1], None
+    if len(parts) == 3 and parts[0] != "context":
+        return parts[0], parts[1], parts[2]
+    raise AutomationError(f"Invalid key '{key}'")
+
+def _dependency(key: str) -> str:
+    """Index key a condition or trigger on `key` depends on."""
+    section, name, _ = _parse_key(key)
+    return f"{section}.{name}"
+
+class CompiledRule:
+    """A rule with its conditions turned into closures."""
+
+    def __init__(self, spec: Dict[str, Any], position: int):
+        try:
+            self.name = spec["name"]
+            trigger = spec["trigger"]
+            self.trigger_type = trigger["type"]
+        except (KeyError, TypeError) as e:
+            raise AutomationError(f"Rule is missing {e}")
+        if self.trigger_type not in ("arrival", "state_change", "time"):
+            raise AutomationError(f"Rule '{self.name}' has unknown trigger '{self.trigger_type}'")
+
+        self.position = position
+        self.spec = spec
+        self.at = trigger.get("at")
+        if self.trigger_type == "time" and not self.at:
+            raise AutomationError(f"Time rule '{self.name}' needs 'at'")
+
+        self.conditions = [self._compile_condition(c) for c in spec.get("conditions", [])]
+        self.actions = spec.get("actions", [])
+        for action in self.actions:
+            if action.get("type") not in ("set", "report", "attention", "announce"):
+                raise AutomationError(f"Rule '{self.name}' has unknown action {action}")
+            if action["type"] == "set":
+                if not isinstance(action.get("key"), str):
+                    raise AutomationError(f"Rule '{self.name}' has a set action without a 'key': {action}")
+                _parse_key(action["key"])
+
+        if self.trigger_type == "state_change":
+            if trigger.get("key"):
+                self.dependencies = {_dependency(trigger["key"])}
+            else:
+                self.dependencies = {
+                    _dependency(c["key"]) for c in spec.get("conditions", [])
+                    if not c["key"].startswith("context.")
+                }
+
+    def _compile_condition(self, spec: Dict[str, Any]) -> Callable[[State, Dict[str, Any]], Tuple[bool, Optional[List[str]]]]:
+        """Turn a condition into fn(state, context) -> (passed, keys bound by an "each" match)."""
+        key = spec.get("key") if isinstance(spec, dict) else None
+        if not isinstance(key, str):
+            raise AutomationError(f"Rule '{self.name}' has a condition without a 'key': {spec}")
+        compare = OPERATORS.get(spec.get("op", "eq"))
+        if compare is None:
+            raise AutomationError(f"Rule '{self.name}' has unknown operator '{spec.get('op')}'")
+        expected = spec.get("value")
+        match = spec.get("match", "all")
+
+        if key.startswith("context."):
+            name = key.split(".", 1)[1]
+            return lambda state, context: (
+                name in context and compare(context[name], expected), None
+            )
+
+        try:
+            section, name, field = _parse_key(key)
+        except AutomationError as e:
+            raise AutomationError(f"Rule '{self.name}': {e}")
+
+        def values(state: State) -> List[Tuple[str, Any]]:
+            entries = state.get(section, {})
+            items = entries.items() if name == "*" else (
+                [(name, entries[name])] if name in entries else []
+            )
+            if field is None:
+                return list(items)
+            return [
+                (k, v[field]) for k, v in items
+                if isinstance(v, dict) and field in v
+            ]
+
+        if name != "*":
+            def check(state, context):
+                found = values(state)
+                return bool(found) and compare(found[0][1], expected), None
+        elif match == "any":
+            def check(state, context):
+                return any(compare(v, expected) for _, v in values(state)), None
+        elif match == "each":
+            def check(state, context):
+                keys = [k for k, v in values(state) if compare(v, expected)]
+                return bool(keys), keys
+        else:
+            def check(state, context):
+                return all(compare(v, expected) for _, v in values(state)), None
+        return check
+
+    def evaluate(self, state: State, context: Dict[str, Any]) -> Optional[AutomationResult]:
+        """Check conditions and apply actions to `state`; None if the rule did not fire."""
+        bindings: Optional[List[str]] = None
+        for condition in self.conditions:
+            passed, keys = condition(state, context)
+            if not passed:
+                return None
+            if keys is not None:
+                bindings = keys
+
+        result = AutomationResult()
+        result.fired.append(self.name)
+        for bound_key in (bindings if bindings is not None else [None]):
+            for action in self.actions:
+                self._apply_action(action, bound_key, state, result)
+        return result
+
+    def _apply_action(self, action: Dict[str, Any], bound_key: Optional[str], state: State, result: AutomationResult) -> None:
+        action_type = action["type"]
+        if action_type == "set":
+            section, name, field = _parse_key(action["key"].replace("{key}", bound_key or ""))
+            entries = state.setdefault(section, {})
+            for key in (list(entries) if name == "*" else [name]):
+                if field is None:
+                    if entries.get(key) == action["value"]:
+                        continue
+                    entries[key] = action["value"]
+                else:
+                    entry = entries.get(key)
+                    if not isinstance(entry, dict) or entry.get(field) == action["value"]:
+                        continue
+                    entry[field] = action["value"]
+                # Deltas are per key, so record the whole entry
+                result.changes.setdefault(section, {})[key] = copy.deepcopy(entries[key])
+            return
+
+        message = action["message"]
+        if bound_key is not None:
+            message = message.format(key=bound_key, name=bound_key.replace("_", " "))
+        if action_type == "report":
+            result.updates.append(message)
+        elif action_type == "attention":
+            result.attention.append(message)
+        else:
+            result.announcements.append(message)
+
+class AutomationEngine:
+    """
+    Holds compiled rules indexed by trigger.
+
+    State-change rules are indexed by the "<section>.<key>" or
+    "<section>.*" keys they depend on, so a change only evaluates the rules
+    that can react to it.
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None):
+        self._lock = threading.Lock()
+        self.load(rules or [])
+
+    def load(self, rules: List[Dict[str, Any]]) -> None:
+        """Compile rules and rebuild the trigger indexes."""
+        compiled = [CompiledRule(spec, position) for position, spec in enumerate(rules)]
+        arrival: List[CompiledRule] = []
+        by_time: Dict[str, List[CompiledRule]] = {}
+        by_key: Dict[str, List[CompiledRule]] = {}
+        for rule in compiled:
+            if rule.trigger_type == "arrival":
+                arrival.append(rule)
+            elif rule.trigger_type == "time":
+                by_time.setdefault(rule.at, []).append(rule)
+            else:
+                for dependency in rule.dependencies:
+                    by_key.setdefault(dependency, []).append(rule)
+
+        with self._lock:
+            self._rules = compiled
+            self._arrival = arrival
+            self._by_time = by_time
+            self._by_key = by_key
+
+    def load_file(self, path: str = RULES_PATH) -> int:
+        """Load rules from a JSON file. Returns the number of rules."""
+        data = load_json_file(path)
+        rules = data.get("rules", []) if isinstance(data, dict) else data
+        self.load(rules)
+        return len(rules)
+
+    def describe(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [rule.spec for rule in self._rules]
+
+    def has_time_rules(self) -> bool:
+        with self._lock:
+            return bool(self._by_time)
+
+    def run(self, rules: List[CompiledRule], state: State, context: Dict[str, Any]) -> AutomationResult:
+        """Evaluate rules in definition order; later rules see earlier changes."""
+        result = AutomationResult()
+        for rule in sorted(rules, key=lambda r: r.position):
+            fired = rule.evaluate(state, context)
+            if fired:
+                result.merge(fired)
+        return result
+
+    def on_arrival(self, state: State, context: Dict[str, Any]) -> AutomationResult:
+        with self._lock:
+            rules = list(self._arrival)
+        return self.run(rules, state, context)
+
+    def at_time(self, hhmm: str, state: State) -> AutomationResult:
+        with self._lock:
+            rules = list(self._by_time.get(hhmm, []))
+        return self.run(rules, state, {"time": hhmm})
+
+    def on_state_change(self, changes: State, state: State) -> AutomationResult:
+        """
+        Evaluate the rules affected by `changes`, then the rules affected by
+        their changes, up to MAX_CASCADE_DEPTH rounds.
+        """
+        result = AutomationResult()
+        pending = changes
+        for _ in range(MAX_CASCADE_DEPTH):
+            rules = self.rules_for_changes(pending)
+            if not rules:
+                break
+            step = self.run(rules, state, {"changes": pending})
+            result.merge(step)
+            pending = step.changes
+            if not pending:
+                break
+        return result
+
+    def rules_for_changes(self, changes: State) -> List[CompiledRule]:
+        """Look up the state-change rules depending on any changed key."""
+        selected: Dict[int, CompiledRule] = {}
+        with self._lock:
+            for section, section_changes in changes.items():
+                for rule in self._by_key.get(f"{section}.*", []):
+                    selected[rule.position] = rule
+                for key in section_changes:
+                    for rule in self._by_key.get(f"{section}.{key}", []):
+                        selected[rule.position] = rule
+        return list(selected.values())
+
+automation_engine = AutomationEngine()
+
+# A broken rules file must not take the router down; start without rules
+# and let POST /automation/reload pick up the corrected file
+try:
+    automation_engine.load_file()
+except FileNotFoundError:
+    print(f"Warning: automation rules not found at {RULES_PATH}")
+except ValueError as e:
+    # AutomationError and json.JSONDecodeError are both ValueErrors
+    print(f"Warning: invalid automation rules in {RULES_PATH}, starting with none: {e}")
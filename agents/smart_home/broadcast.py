@@ -0,0 +1,114 @@
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+import asyncio
+import json
+import os
+import threading
+
+# Messages buffered per subscriber before it is told to resynchronize
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("STATUS_STREAM_QUEUE_SIZE", "100"))
+
+# Message handed to subscribers: (type, JSON payload)
+StreamMessage = Tuple[str, str]
+
+RESYNC: StreamMessage = ("resync", "{}")
+
+class Subscription:
+    """A single stream client: its queue and the event loop that drains it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: "asyncio.Queue[StreamMessage]" = asyncio.Queue(maxsize=maxsize)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[StreamMessage]:
+        """Wait for the next message, or return None after timeout seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class StatusBroadcaster:
+    """
+    Fans home status changes out to any number of stream subscribers.
+
+    Each change is serialized once and the same payload is handed to every
+    subscriber. A subscriber that falls behind has its backlog replaced by a
+    single resync message, after which it should fetch a fresh snapshot.
+    publish() may be called from any thread.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: set = set()
+        self.sequence = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Connected subscribers and the number of diffs published."""
+        with self._lock:
+            sequence = self.sequence
+        return {
+            "subscribers": self.subscriber_count,
+            "published": sequence,
+            "queue_size": self.queue_size
+        }
+
+    def subscribe(self) -> Subscription:
+        """Register a subscriber on the running event loop."""
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, changes: Dict[str, Dict[str, Any]], last_updated: datetime) -> None:
+        """Send a state diff to all subscribers."""
+        if not changes:
+            return
+        with self._lock:
+            self.sequence += 1
+            subscribers = list(self._subscribers)
+            sequence = self.sequence
+        if not subscribers:
+            return
+
+        message: StreamMessage = ("diff", json.dumps({
+            "sequence": sequence,
+            "changes": changes,
+            "last_updated": last_updated.isoformat()
+        }))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(self._offer, subscription, message)
+            except RuntimeError:
+                # The subscriber's loop has closed
+                self.unsubscribe(subscription)
+
+    def snapshot_message(self, status: Dict[str, Any], last_updated: datetime) -> StreamMessage:
+        """Build the full-state message sent when a stream starts or resyncs."""
+        with self._lock:
+            sequence = self.sequence
+        return ("snapshot", json.dumps({
+            "sequence": sequence,
+            "status": status,
+            "last_updated": last_updated.isoformat()
+        }))
+
+    @staticmethod
+    def _offer(subscription: Subscription, message: StreamMessage) -> None:
+        try:
+            subscription.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(RESYNC)
+
+status_broadcaster = StatusBroadcaster()
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, JSON, Enum as SQLEnum
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, JSON, Index, UniqueConstraint, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -14,7 +14,7 @@ engine = create_engine(DATABASE_URL)
 Base = declarative_base()
 
 class HomeStateDB(Base):
-    """Database model for home state"""
+    """Database model for compacted home state checkpoints"""
     __tablename__ = "home_state"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -49,18 +49,80 @@ class HomeStateDB(Base):
             for name, data in plants_data.items()
         }
 
+class HomeStateDeltaDB(Base):
+    """Database model for per-key home state changes since the last checkpoint"""
+    __tablename__ = "home_state_delta"
+
+    id = Column(Integer, primary_key=True, index=True)
+    section = Column(String(20))  # "temperature", "lights", "security" or "plants"
+    key = Column(String(100))  # Room, device or plant name
+    value = Column(JSON, nullable=True)  # New value; null means the key was removed
+    timestamp = Column(DateTime, default=datetime.now)
+
+class TemperatureReadingDB(Base):
+    """Database model for individual room temperature readings"""
+    __tablename__ = "temperature_readings"
+    __table_args__ = (
+        Index("ix_temperature_readings_room_timestamp", "room", "timestamp"),
+        # Retention deletes old rows; ids must not be reused, because
+        # TemperatureSeries loads new readings by id
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    room = Column(String(100))
+    timestamp = Column(DateTime, default=datetime.now, index=True)
+    value = Column(Float)  # Fahrenheit
+
 class EventLogDB(Base):
     """Database model for event logging"""
     __tablename__ = "event_log"
 
+    __table_args__ = (
+        # Serves type-filtered history ordered by time
+        Index("ix_event_log_type_timestamp", "event_type", "timestamp"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime, default=datetime.now)
+    timestamp = Column(DateTime, default=datetime.now, index=True)
     event_type = Column(String(50))  # e.g., "arrival", "light_control", "security_change"
     details = Column(JSON)  # Store event details as JSON
 
+class EventRollupDB(Base):
+    """Database model for hourly event counts kept after raw events expire"""
+    __tablename__ = "event_log_hourly"
+    __table_args__ = (
+        UniqueConstraint("event_type", "hour", name="uq_event_log_hourly_type_hour"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    hour = Column(DateTime, index=True)  # Start of the hour
+    event_type = Column(String(50))
+    count = Column(Integer, default=0)
+
+class TemperatureRollupDB(Base):
+    """Database model for hourly temperature statistics kept after raw readings expire"""
+    __tablename__ = "temperature_readings_hourly"
+    __table_args__ = (
+        UniqueConstraint("room", "hour", name="uq_temperature_readings_hourly_room_hour"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    hour = Column(DateTime, index=True)  # Start of the hour
+    room = Column(String(100))
+    count = Column(Integer, default=0)
+    min_value = Column(Float)
+    max_value = Column(Float)
+    sum_value = Column(Float)  # Mean is sum_value / count; a sum lets batches merge
+
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+# create_all skips indexes on tables that already exist
+for table in (EventLogDB.__table__, TemperatureReadingDB.__table__):
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -71,12 +133,3 @@ def get_db():
         yield db
     finally:
         db.close()
-
-def log_event(db, event_type: str, details: Dict[str, Any]) -> None:
-    """Log an event to the database"""
-    event = EventLogDB(
-        event_type=event_type,
-        details=details
-    )
-    db.add(event)
-    db.commit() 
\ No newline at end of file
@@ -0,0 +1,81 @@
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+import base64
+from .database import EventLogDB
+
+# Cursor position: timestamp and id of the last event returned
+Cursor = Tuple[datetime, int]
+
+def encode_cursor(event: EventLogDB) -> str:
+    """Encode the position of an event as an opaque pagination cursor."""
+    raw = f"{event.timestamp.isoformat()}|{event.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(event_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def query_events(
+    db: Session,
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[Cursor] = None,
+    limit: int = 50,
+    newest_first: bool = True
+) -> List[EventLogDB]:
+    """
+    Fetch one page of events in (timestamp, id) order.
+
+    Pages continue strictly after the `after` position, so each page is a
+    range seek on the (event_type, timestamp) or timestamp index instead of
+    an OFFSET scan. `since` is inclusive and `until` exclusive.
+    """
+    query = db.query(EventLogDB)
+
+    if event_type:
+        query = query.filter(EventLogDB.event_type == event_type)
+    if since:
+        query = query.filter(EventLogDB.timestamp >= since)
+    if until:
+        query = query.filter(EventLogDB.timestamp < until)
+
+    if after:
+        timestamp, event_id = after
+        if newest_first:
+            query = query.filter(or_(
+                EventLogDB.timestamp < timestamp,
+                and_(EventLogDB.timestamp == timestamp, EventLogDB.id < event_id)
+            ))
+        else:
+            query = query.filter(or_(
+                EventLogDB.timestamp > timestamp,
+                and_(EventLogDB.timestamp == timestamp, EventLogDB.id > event_id)
+            ))
+
+    if newest_first:
+        query = query.order_by(EventLogDB.timestamp.desc(), EventLogDB.id.desc())
+    else:
+        query = query.order_by(EventLogDB.timestamp, EventLogDB.id)
+
+    return query.limit(limit).all()
+
+def serialize_event(event: EventLogDB) -> Dict[str, Any]:
+    """Convert an event row into its API representation."""
+    return {
+        "id": event.id,
+        "timestamp": event.timestamp,
+        "event_type": event.event_type,
+        "details": event.details
+    }
@@ -0,0 +1,225 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import os
+import threading
+import time
+from .database import SessionLocal, EventLogDB
+
+# Seconds between background flushes of buffered events
+FLUSH_INTERVAL = float(os.getenv("EVENT_LOG_FLUSH_INTERVAL", "1.0"))
+
+# Flush early once this many events are buffered
+FLUSH_BATCH_SIZE = int(os.getenv("EVENT_LOG_BATCH_SIZE", "200"))
+
+# Events kept in memory at most; beyond this the oldest are dropped so a
+# stalled writer cannot grow memory without bound or block producers
+MAX_BUFFERED = int(os.getenv("EVENT_LOG_MAX_BUFFERED", "5000"))
+
+# Consecutive failed flushes before the buffered batch is dropped
+MAX_FLUSH_ATTEMPTS = int(os.getenv("EVENT_LOG_MAX_FLUSH_ATTEMPTS", "3"))
+
+class EventSink:
+    """
+    Buffers EventLogDB inserts and writes them in one transaction per batch.
+
+    Events are flushed every flush_interval seconds or as soon as batch_size
+    events are waiting, whichever comes first, and on shutdown.
+
+    A batch rejected for its contents is retried row by row so one bad
+    event is dropped instead of blocking the rest. After a database error
+    (OperationalError) the batch is put back for the next flush, and
+    dropped after max_attempts consecutive failures. Dropped events are
+    counted in metrics().
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = FLUSH_INTERVAL,
+        batch_size: int = FLUSH_BATCH_SIZE,
+        max_buffered: int = MAX_BUFFERED,
+        max_attempts: int = MAX_FLUSH_ATTEMPTS
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffered = max_buffered
+        self.max_attempts = max_attempts
+        self._buffer: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.submitted = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self._attempts = 0  # Consecutive failed flushes
+        self.last_flush_at: Optional[datetime] = None
+        self.last_flush_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Start the background flusher if it is not running."""
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="event-log-flusher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the flusher and write everything still buffered."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread and thread.is_alive():
+            thread.join(timeout)
+        self.flush()
+
+    def submit(self, event_type: str, details: Dict[str, Any], timestamp: Optional[datetime] = None) -> None:
+        """Buffer an event; the timestamp is taken now, not at write time."""
+        self.start()
+        row = {
+            "event_type": event_type,
+            "details": details,
+            "timestamp": timestamp or datetime.now()
+        }
+        with self._cond:
+            self._buffer.append(row)
+            self.submitted += 1
+            self._trim()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self) -> int:
+        """Write all buffered events in a single transaction. Returns the count written."""
+        with self._write_lock:
+            with self._cond:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self._insert(rows)
+            except OperationalError as e:
+                return self._retry_later(rows, e)
+            except Exception as e:
+                print(f"Event log flush failed, retrying row by row: {e}")
+                return self._flush_rows(rows, e)
+
+            with self._cond:
+                self._attempts = 0
+                self._record_flush(len(rows), started)
+                self.last_error = None
+            return len(rows)
+
+    def _flush_rows(self, rows: List[Dict[str, Any]], error: Exception) -> int:
+        """Write a batch rejected for its contents one row at a time, dropping the bad rows."""
+        started = time.perf_counter()
+        written = 0
+        for position, row in enumerate(rows):
+            try:
+                self._insert([row])
+                written += 1
+            except OperationalError as e:
+                self._retry_later(rows[position:], e)
+                break
+            except Exception as e:
+                error = e
+                with self._cond:
+                    self.dropped += 1
+        else:
+            with self._cond:
+                self.failed_flushes += 1
+                self.last_error = str(error)
+
+        with self._cond:
+            if written:
+                self._record_flush(written, started)
+        return written
+
+    def _retry_later(self, rows: List[Dict[str, Any]], error: Exception) -> int:
+        """Put rows back after a database error, or drop them after max_attempts failures."""
+        print(f"Event log flush failed: {error}")
+        with self._cond:
+            self.failed_flushes += 1
+            self.last_error = str(error)
+            self._attempts += 1
+            if self._attempts >= self.max_attempts:
+                self._attempts = 0
+                self.dropped += len(rows)
+                print(f"Event log dropped {len(rows)} events after {self.max_attempts} failed flushes")
+            else:
+                # Put the batch back in front so ordering is kept for the retry
+                self._buffer = rows + self._buffer
+                self._trim()
+        return 0
+
+    @staticmethod
+    def _insert(rows: List[Dict[str, Any]]) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(insert(EventLogDB), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _record_flush(self, written: int, started: float) -> None:
+        """Update flush statistics; called with the condition held."""
+        self.written += written
+        self.flushes += 1
+        self.last_flush_at = datetime.now()
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def _trim(self) -> None:
+        """Drop the oldest events beyond max_buffered; called with the condition held."""
+        overflow = len(self._buffer) - self.max_buffered
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and flush statistics."""
+        with self._cond:
+            return {
+                "queue_depth": len(self._buffer),
+                "submitted": self.submitted,
+                "written": self.written,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "dropped": self.dropped,
+                "avg_batch_size": round(self.written / self.flushes, 2) if self.flushes else 0,
+                "last_flush_at": self.last_flush_at,
+                "last_flush_ms": self.last_flush_ms,
+                "last_error": self.last_error,
+                "flush_interval": self.flush_interval,
+                "batch_size": self.batch_size,
+                "max_buffered": self.max_buffered,
+                "running": bool(self._thread and self._thread.is_alive())
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                # After a failed flush wait the full interval before retrying
+                if not self._stopping and (len(self._buffer) < self.batch_size or self._attempts):
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                break
+
+event_sink = EventSink()
+
+def log_event(event_type: str, details: Dict[str, Any]) -> None:
+    """Log an event through the buffered event sink"""
+    event_sink.submit(event_type, details)
@@ -1,37 +1,68 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import Dict, Any, Optional, List
-import pyttsx3
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, Response
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, Optional, List, AsyncIterator
 from datetime import datetime
 from sqlalchemy.orm import Session
-from .database import get_db, HomeStateDB, EventLogDB, log_event
-from .models import DeviceStatus, SecurityStatus, PlantStatus, Plant, HomeStatus
+import asyncio
+import json
+from .database import get_db, SessionLocal, EventRollupDB, TemperatureRollupDB
+from .state_store import (
+    StateChanges, load_home_state, save_checkpoint, serialize_home_status,
+    write_state_changes, get_state_version
+)
+from .status_cache import home_status_cache
+from .speech import speech_queue
+from .event_sink import event_sink, log_event
+from .broadcast import status_broadcaster, StreamMessage, RESYNC
+from .event_history import query_events, serialize_event, encode_cursor, decode_cursor
+from .retention import retention_job
+from .temperature import temperature_series
+from .automation import automation_engine, AutomationResult, AutomationError
+from .models import DeviceStatus, Plant, HomeStatus
 
 router = APIRouter()
 
-# Initialize text-to-speech engine
-try:
-    engine = pyttsx3.init()
-except Exception as e:
-    print(f"Warning: TTS engine initialization failed: {e}")
-    engine = None
-
-def play_welcome_message(message: str) -> None:
-    """Play welcome message using text-to-speech or fall back to print."""
-    print(f"Welcome message: {message}")  # Fallback/logging
-    if engine:
-        try:
-            engine.say(message)
-            engine.runAndWait()
-        except Exception as e:
-            print(f"TTS playback failed: {e}")
+# Seconds between keep-alive messages on idle status streams
+STREAM_HEARTBEAT_SECONDS = 15.0
+
+# Events fetched per query while exporting history
+EXPORT_BATCH_SIZE = 1000
+
+# Background task evaluating time-triggered automations
+time_automation_task: Optional[asyncio.Task] = None
+
+@router.on_event("startup")
+async def start_background_workers() -> None:
+    """Start periodic retention and the time-triggered automation loop."""
+    global time_automation_task
+    if retention_job.interval > 0:
+        retention_job.start()
+    time_automation_task = asyncio.create_task(run_time_automations())
+
+@router.on_event("shutdown")
+def stop_background_workers() -> None:
+    """Let queued announcements finish and flush buffered events before exit."""
+    if time_automation_task:
+        time_automation_task.cancel()
+    retention_job.stop()
+    speech_queue.stop()
+    event_sink.stop()
 
 def get_current_home_status(db: Session) -> HomeStatus:
-    """Load and validate current home status."""
-    home_state = db.query(HomeStateDB).order_by(HomeStateDB.id.desc()).first()
+    """Load and validate current home status, served from the cache when current."""
+    cached = home_status_cache.get(db)
+    if cached is not None:
+        return cached
+    
+    # Read the version first so a concurrent write can only make the cached
+    # entry look older than it is, never newer
+    version = get_state_version(db)
+    home_state = load_home_state(db)
     
     if not home_state:
         # Initialize with default values if no state exists
-        home_state = HomeStateDB(
+        home_state = save_checkpoint(db, dict(
             temperature={"living_room": 72.0, "bedroom": 70.0, "kitchen": 73.0},
             lights={"living_room": "off", "bedroom": "off", "kitchen": "off"},
             security={"front_door": "locked", "back_door": "locked", "alarm_system": "armed"},
@@ -42,14 +73,14 @@ def get_current_home_status(db: Session) -> HomeStatus:
                     "needs_water": False,
                     "notes": None
                 }
-            },
-            last_updated=datetime.now()
-        )
-        db.add(home_state)
+            }
+        ), datetime.now())
+        db.flush()
+        version = get_state_version(db)
         db.commit()
         db.refresh(home_state)
     
-    return HomeStatus(
+    home_status = HomeStatus(
         temperature=home_state.temperature_dict,
         lights=home_state.lights_dict,
         security=home_state.security_dict,
@@ -59,6 +90,72 @@ def get_current_home_status(db: Session) -> HomeStatus:
         },
         last_updated=home_state.last_updated
     )
+    home_status_cache.put(home_status, version)
+    return home_status
+
+def save_state_changes(db: Session, state: StateChanges, changes: StateChanges) -> AutomationResult:
+    """
+    Persist changed keys together with the follow-up changes of the
+    state-change automations they trigger, then refresh the status cache
+    and notify stream subscribers.
+
+    `state` must already include `changes`; automation changes are applied
+    to it in place. Returns the result of the triggered automations.
+    """
+    follow_up = automation_engine.on_state_change(changes, state) if changes else AutomationResult()
+    all_changes = {section: dict(section_changes) for section, section_changes in changes.items()}
+    for section, section_changes in follow_up.changes.items():
+        all_changes.setdefault(section, {}).update(section_changes)
+    if not all_changes:
+        return follow_up
+    
+    timestamp = datetime.now()
+    home_status = HomeStatus(**state, last_updated=timestamp)
+    write_state_changes(db, all_changes, timestamp)
+    db.flush()
+    version = get_state_version(db)
+    db.commit()
+    home_status_cache.put(home_status, version)
+    status_broadcaster.publish(all_changes, timestamp)
+    
+    report_automations(follow_up)
+    return follow_up
+
+def report_automations(result: AutomationResult) -> None:
+    """Log fired automation rules and queue their announcements."""
+    if not result.fired:
+        return
+    log_event("automation", {
+        "rules": result.fired,
+        "updates": result.updates,
+        "attention_needed": result.attention
+    })
+    for message in result.announcements:
+        speech_queue.enqueue(message)
+
+async def run_time_automations() -> None:
+    """
+    Evaluate time-triggered rules at the start of every minute. Minutes are
+    skipped without touching the database while no time rules are loaded;
+    the loop keeps running so rules added by a reload take effect.
+    """
+    while True:
+        now = datetime.now()
+        await asyncio.sleep(60 - now.second - now.microsecond / 1_000_000)
+        if not automation_engine.has_time_rules():
+            continue
+        hhmm = datetime.now().strftime("%H:%M")
+        db = SessionLocal()
+        try:
+            state = serialize_home_status(get_current_home_status(db))
+            result = automation_engine.at_time(hhmm, state)
+            if result.fired:
+                save_state_changes(db, state, result.changes)
+                report_automations(result)
+        except Exception as e:
+            print(f"Time automation failed at {hhmm}: {e}")
+        finally:
+            db.close()
 
 @router.post("/arrive")
 async def user_arrived(
@@ -66,35 +163,18 @@ async def user_arrived(
     disarm_security: bool = Query(True, description="Automatically disarm security system"),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
-    """Handle user arrival at home."""
+    """Handle user arrival at home by running the arrival automations."""
     try:
         # Load and validate current status
-        home_status = get_current_home_status(db)
-        
-        # Update home state
-        updates_made = []
-        
-        if auto_lights and all(status == DeviceStatus.OFF for status in home_status.lights.values()):
-            # Turn on main lights if all are off
-            home_status.lights["living_room"] = DeviceStatus.ON
-            home_status.lights["kitchen"] = DeviceStatus.ON
-            updates_made.append("turned on main lights")
-        
-        if disarm_security and home_status.security["alarm_system"] == SecurityStatus.ARMED:
-            home_status.security["alarm_system"] = SecurityStatus.DISARMED
-            updates_made.append("disarmed security system")
-        
-        # Check for items needing attention
-        attention_items = []
+        state = serialize_home_status(get_current_home_status(db))
         
-        # Check plants
-        for plant_name, plant in home_status.plants.items():
-            if plant.needs_water:
-                attention_items.append(f"{plant_name.replace('_', ' ')} needs water")
-        
-        # Check security
-        if any(status == SecurityStatus.UNLOCKED for status in home_status.security.values()):
-            attention_items.append("some doors are unlocked")
+        # Apply arrival rules; they update `state` and collect messages
+        result = automation_engine.on_arrival(state, {
+            "auto_lights": auto_lights,
+            "disarm_security": disarm_security
+        })
+        updates_made = result.updates
+        attention_items = result.attention
         
         # Generate welcome message
         welcome_msg = "Welcome home!"
@@ -103,41 +183,27 @@ async def user_arrived(
         if attention_items:
             welcome_msg += f" Please note: {', '.join(attention_items)}."
         
-        # Save updated status
-        home_status.last_updated = datetime.now()
-        new_state = HomeStateDB(
-            temperature=home_status.temperature,
-            lights={k: v.value for k, v in home_status.lights.items()},
-            security={k: v.value for k, v in home_status.security.items()},
-            plants={
-                name: {
-                    "last_watered": plant.last_watered.isoformat(),
-                    "moisture_level": plant.moisture_level.value,
-                    "needs_water": plant.needs_water,
-                    "notes": plant.notes
-                }
-                for name, plant in home_status.plants.items()
-            },
-            last_updated=home_status.last_updated
-        )
-        db.add(new_state)
+        # Save only the keys that changed
+        save_state_changes(db, state, result.changes)
         
         # Log the arrival event
-        log_event(db, "arrival", {
+        log_event("arrival", {
             "updates": updates_made,
             "attention_needed": attention_items,
             "auto_lights": auto_lights,
-            "disarm_security": disarm_security
+            "disarm_security": disarm_security,
+            "rules": result.fired
         })
         
-        db.commit()
-        
-        # Play welcome message
-        play_welcome_message(welcome_msg)
+        # Announce in the background so the response is not held up by TTS
+        announcement = speech_queue.enqueue(welcome_msg)
+        for message in result.announcements:
+            speech_queue.enqueue(message)
         
         return {
             "message": "Welcome sequence completed",
             "welcome_message": welcome_msg,
+            "announcement": announcement,
             "updates": updates_made,
             "attention_needed": attention_items,
             "arrival_time": datetime.now().isoformat()
@@ -175,6 +241,84 @@ async def get_home_status(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving home status: {str(e)}")
 
+def current_snapshot_message() -> StreamMessage:
+    """Build a full-state stream message from the current home status."""
+    db = SessionLocal()
+    try:
+        home_status = get_current_home_status(db)
+    finally:
+        db.close()
+    return status_broadcaster.snapshot_message(
+        serialize_home_status(home_status), home_status.last_updated
+    )
+
+async def status_messages() -> AsyncIterator[Optional[StreamMessage]]:
+    """
+    Yield a snapshot followed by every published diff.
+
+    Subscribes before taking the snapshot so no change is missed; a diff
+    that is already contained in the snapshot is harmless to reapply. Yields
+    None when the stream has been idle for STREAM_HEARTBEAT_SECONDS.
+    """
+    subscription = None
+    try:
+        subscription = status_broadcaster.subscribe()
+        yield current_snapshot_message()
+        while True:
+            message = await subscription.get(STREAM_HEARTBEAT_SECONDS)
+            if message == RESYNC:
+                message = current_snapshot_message()
+            yield message
+    finally:
+        if subscription is not None:
+            status_broadcaster.unsubscribe(subscription)
+
+@router.get("/status/stream")
+async def stream_home_status(request: Request) -> StreamingResponse:
+    """Stream home status changes as server-sent events."""
+    async def event_stream():
+        messages = status_messages()
+        try:
+            async for message in messages:
+                if await request.is_disconnected():
+                    break
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                event_type, payload = message
+                yield f"event: {event_type}\ndata: {payload}\n\n"
+        finally:
+            # Unsubscribe now rather than whenever the generator is collected
+            await messages.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/status/ws")
+async def home_status_websocket(websocket: WebSocket) -> None:
+    """Push home status changes over a WebSocket."""
+    await websocket.accept()
+    messages = status_messages()
+    try:
+        async for message in messages:
+            if message is None:
+                await websocket.send_text('{"type": "keep-alive"}')
+                continue
+            event_type, payload = message
+            await websocket.send_text(f'{{"type": "{event_type}", "data": {payload}}}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await messages.aclose()
+
+@router.get("/status/stream/metrics")
+async def get_status_stream_metrics() -> Dict[str, Any]:
+    """Get the number of connected status stream subscribers."""
+    return status_broadcaster.metrics()
+
 @router.post("/lights/{room}")
 async def control_lights(
     room: str,
@@ -188,36 +332,18 @@ async def control_lights(
         if room not in home_status.lights:
             raise HTTPException(status_code=404, detail=f"Room '{room}' not found")
         
-        home_status.lights[room] = status
-        home_status.last_updated = datetime.now()
-        
-        # Save updated status
-        new_state = HomeStateDB(
-            temperature=home_status.temperature,
-            lights={k: v.value for k, v in home_status.lights.items()},
-            security={k: v.value for k, v in home_status.security.items()},
-            plants={
-                name: {
-                    "last_watered": plant.last_watered.isoformat(),
-                    "moisture_level": plant.moisture_level.value,
-                    "needs_water": plant.needs_water,
-                    "notes": plant.notes
-                }
-                for name, plant in home_status.plants.items()
-            },
-            last_updated=home_status.last_updated
-        )
-        db.add(new_state)
+        previous_status = home_status.lights[room]
+        state = serialize_home_status(home_status)
+        state["lights"][room] = status.value
+        save_state_changes(db, state, {"lights": {room: status.value}})
         
         # Log the light control event
-        log_event(db, "light_control", {
+        log_event("light_control", {
             "room": room,
             "status": status.value,
-            "previous_status": home_status.lights[room].value
+            "previous_status": previous_status.value
         })
         
-        db.commit()
-        
         return {
             "message": f"Lights in {room} turned {status}",
             "room": room,
@@ -228,29 +354,216 @@ async def control_lights(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error controlling lights: {str(e)}")
 
+@router.post("/temperature/{room}")
+async def record_temperature(
+    room: str,
+    value: float = Query(..., ge=-40, le=150, description="Reading in Fahrenheit"),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Record a temperature sensor reading for a room."""
+    try:
+        home_status = get_current_home_status(db)
+        
+        if room not in home_status.temperature:
+            raise HTTPException(status_code=404, detail=f"Room '{room}' not found")
+        
+        previous_value = home_status.temperature[room]
+        state = serialize_home_status(home_status)
+        state["temperature"][room] = value
+        save_state_changes(db, state, {"temperature": {room: value}})
+        
+        log_event("temperature_reading", {
+            "room": room,
+            "value": value,
+            "previous_value": previous_value
+        })
+        
+        return {
+            "room": room,
+            "temperature": value,
+            "recorded_at": datetime.now().isoformat()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error recording temperature: {str(e)}")
+
+@router.get("/temperature/stats")
+async def get_temperature_stats(
+    room: Optional[str] = Query(None, description="Limit to one room"),
+    since: Optional[datetime] = Query(None, description="Only readings at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only readings before this time"),
+    percentiles: List[float] = Query([50, 90, 99], description="Percentiles between 0 and 100"),
+    db: Session = Depends(get_db)
+) -> List[Dict[str, Any]]:
+    """Get min, max, mean and percentiles of room temperatures over a time window."""
+    if any(p < 0 or p > 100 for p in percentiles):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+    
+    temperature_series.refresh(db)
+    rooms = [room] if room else temperature_series.rooms()
+    return [
+        temperature_series.aggregate(name, since, until, percentiles)
+        for name in rooms
+    ]
+
+@router.get("/temperature/hourly")
+async def get_hourly_temperatures(
+    room: Optional[str] = Query(None, description="Limit to one room"),
+    since: Optional[datetime] = Query(None, description="Only hours starting at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only hours starting before this time"),
+    db: Session = Depends(get_db)
+) -> List[Dict[str, Any]]:
+    """Get hourly min, max and mean temperatures kept for readings past their retention period."""
+    query = db.query(TemperatureRollupDB)
+    
+    if room:
+        query = query.filter(TemperatureRollupDB.room == room)
+    if since:
+        query = query.filter(TemperatureRollupDB.hour >= since)
+    if until:
+        query = query.filter(TemperatureRollupDB.hour < until)
+    
+    return [
+        {
+            "hour": rollup.hour,
+            "room": rollup.room,
+            "count": rollup.count,
+            "min": rollup.min_value,
+            "max": rollup.max_value,
+            "mean": round(rollup.sum_value / rollup.count, 2)
+        }
+        for rollup in query.order_by(TemperatureRollupDB.hour, TemperatureRollupDB.room)
+    ]
+
+@router.get("/automation/rules")
+async def get_automation_rules() -> List[Dict[str, Any]]:
+    """List the loaded automation rules in evaluation order."""
+    return automation_engine.describe()
+
+@router.post("/automation/reload")
+async def reload_automation_rules() -> Dict[str, Any]:
+    """Reload and recompile automation rules from the rules file."""
+    try:
+        count = automation_engine.load_file()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (AutomationError, json.JSONDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid automation rules: {str(e)}")
+    return {"message": "Automation rules reloaded", "rules": count}
+
+@router.get("/speech/status")
+async def get_speech_status() -> Dict[str, Any]:
+    """Get the state of the announcement playback queue."""
+    return speech_queue.status()
+
+@router.get("/events/metrics")
+async def get_event_log_metrics() -> Dict[str, Any]:
+    """Get queue depth and flush statistics of the buffered event log."""
+    return event_sink.metrics()
+
 @router.get("/events")
 async def get_events(
+    response: Response,
     event_type: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Only events at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only events before this time"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
     limit: int = Query(default=50, gt=0, le=100),
     db: Session = Depends(get_db)
 ) -> List[Dict[str, Any]]:
-    """Get event history with optional filtering."""
-    query = db.query(EventLogDB).order_by(EventLogDB.timestamp.desc())
+    """
+    Get event history, newest first, with optional filtering.
+
+    When more events match, the X-Next-Cursor response header holds the
+    cursor for the next page.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Make events logged by earlier requests visible to this query
+    await run_in_threadpool(event_sink.flush)
+    events = query_events(db, event_type, since, until, after, limit + 1)
+    
+    if len(events) > limit:
+        events = events[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(events[-1])
+    
+    return [serialize_event(event) for event in events]
+
+@router.get("/events/export")
+async def export_events(
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Only events at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only events before this time")
+) -> StreamingResponse:
+    """Stream matching events, oldest first, as newline-delimited JSON."""
+    await run_in_threadpool(event_sink.flush)
+    
+    def event_lines():
+        after = None
+        while True:
+            # Short-lived session per batch so the export never holds a
+            # read transaction open for the whole download
+            db = SessionLocal()
+            try:
+                events = query_events(
+                    db, event_type, since, until, after,
+                    EXPORT_BATCH_SIZE, newest_first=False
+                )
+                # ISO timestamps, as /events returns them
+                lines = [
+                    json.dumps({
+                        **serialize_event(event),
+                        "timestamp": event.timestamp.isoformat()
+                    }) + "\n"
+                    for event in events
+                ]
+            finally:
+                db.close()
+            
+            yield "".join(lines)
+            if len(events) < EXPORT_BATCH_SIZE:
+                break
+            after = (events[-1].timestamp, events[-1].id)
+    
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
+@router.get("/events/hourly")
+async def get_hourly_event_counts(
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Only hours starting at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only hours starting before this time"),
+    db: Session = Depends(get_db)
+) -> List[Dict[str, Any]]:
+    """Get hourly event counts kept for events past their retention period."""
+    query = db.query(EventRollupDB)
     
     if event_type:
-        query = query.filter(EventLogDB.event_type == event_type)
+        query = query.filter(EventRollupDB.event_type == event_type)
+    if since:
+        query = query.filter(EventRollupDB.hour >= since)
+    if until:
+        query = query.filter(EventRollupDB.hour < until)
     
-    events = query.limit(limit).all()
     return [
-        {
-            "id": event.id,
-            "timestamp": event.timestamp,
-            "event_type": event.event_type,
-            "details": event.details
-        }
-        for event in events
+        {"hour": rollup.hour, "event_type": rollup.event_type, "count": rollup.count}
+        for rollup in query.order_by(EventRollupDB.hour, EventRollupDB.event_type)
     ]
 
+@router.get("/retention/status")
+async def get_retention_status() -> Dict[str, Any]:
+    """Get retention policies and the result of the last run."""
+    return retention_job.status()
+
+@router.post("/retention/run")
+async def run_retention() -> Dict[str, Any]:
+    """Apply the retention policies now."""
+    await run_in_threadpool(event_sink.flush)
+    return await run_in_threadpool(retention_job.run_once)
+
 # Stretch feature placeholders
 """
 @router.post("/voice-command")
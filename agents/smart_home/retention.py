@@ -0,0 +1,278 @@
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Callable, Tuple
+import os
+import threading
+import time
+from .database import SessionLocal, HomeStateDB, EventLogDB, EventRollupDB, TemperatureReadingDB, TemperatureRollupDB
+from .temperature import temperature_series
+
+# Raw events older than this are rolled up into hourly counts and deleted
+EVENT_RETENTION_DAYS = float(os.getenv("EVENT_LOG_RETENTION_DAYS", "30"))
+
+# Raw temperature readings older than this are rolled up into hourly
+# min/max/mean per room and deleted
+TEMPERATURE_RETENTION_DAYS = float(os.getenv("TEMPERATURE_RETENTION_DAYS", "30"))
+
+# Home state checkpoints older than this are collapsed to one per hour
+SNAPSHOT_RETENTION_HOURS = float(os.getenv("HOME_STATE_RETENTION_HOURS", "24"))
+
+# Rows handled per transaction, bounding how long the write lock is held
+BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+
+# Seconds between background retention runs
+RUN_INTERVAL = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+
+# Pause between batches so other writers can take the lock
+BATCH_PAUSE = 0.05
+
+def truncate_to_hour(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+def rollup_events_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """
+    Roll up and delete the oldest batch of events before cutoff.
+
+    Commits once per batch. Returns the number of events removed.
+    """
+    events = db.query(EventLogDB.id, EventLogDB.timestamp, EventLogDB.event_type).filter(
+        EventLogDB.timestamp < cutoff
+    ).order_by(EventLogDB.timestamp, EventLogDB.id).limit(batch_size).all()
+    if not events:
+        return 0
+
+    counts: Dict[tuple, int] = {}
+    for event in events:
+        key = (event.event_type, truncate_to_hour(event.timestamp))
+        counts[key] = counts.get(key, 0) + 1
+
+    existing = {
+        (row.event_type, row.hour): row
+        for row in db.query(EventRollupDB).filter(
+            EventRollupDB.hour.in_({hour for _, hour in counts}),
+            EventRollupDB.event_type.in_({event_type for event_type, _ in counts})
+        )
+    }
+    for (event_type, hour), count in counts.items():
+        rollup = existing.get((event_type, hour))
+        if rollup:
+            rollup.count += count
+        else:
+            db.add(EventRollupDB(event_type=event_type, hour=hour, count=count))
+
+    db.query(EventLogDB).filter(
+        EventLogDB.id.in_([event.id for event in events])
+    ).delete(synchronize_session=False)
+    db.commit()
+    return len(events)
+
+def rollup_temperatures_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """
+    Fold the oldest batch of readings before cutoff into hourly per-room
+    statistics and delete them.
+
+    Commits once per batch. Returns the number of readings removed.
+    """
+    readings = db.query(
+        TemperatureReadingDB.id,
+        TemperatureReadingDB.room,
+        TemperatureReadingDB.timestamp,
+        TemperatureReadingDB.value
+    ).filter(
+        TemperatureReadingDB.timestamp < cutoff
+    ).order_by(TemperatureReadingDB.timestamp, TemperatureReadingDB.id).limit(batch_size).all()
+    if not readings:
+        return 0
+
+    hours: Dict[tuple, list] = {}
+    for reading in readings:
+        key = (reading.room, truncate_to_hour(reading.timestamp))
+        stats = hours.get(key)
+        if stats:
+            stats[0] += 1
+            stats[1] = min(stats[1], reading.value)
+            stats[2] = max(stats[2], reading.value)
+            stats[3] += reading.value
+        else:
+            hours[key] = [1, reading.value, reading.value, reading.value]
+
+    existing = {
+        (row.room, row.hour): row
+        for row in db.query(TemperatureRollupDB).filter(
+            TemperatureRollupDB.hour.in_({hour for _, hour in hours}),
+            TemperatureRollupDB.room.in_({room for room, _ in hours})
+        )
+    }
+    for (room, hour), (count, low, high, total) in hours.items():
+        rollup = existing.get((room, hour))
+        if rollup:
+            rollup.count += count
+            rollup.min_value = min(rollup.min_value, low)
+            rollup.max_value = max(rollup.max_value, high)
+            rollup.sum_value += total
+        else:
+            db.add(TemperatureRollupDB(
+                room=room, hour=hour, count=count,
+                min_value=low, max_value=high, sum_value=total
+            ))
+
+    db.query(TemperatureReadingDB).filter(
+        TemperatureReadingDB.id.in_([reading.id for reading in readings])
+    ).delete(synchronize_session=False)
+    db.commit()
+    return len(readings)
+
+def collapse_snapshots_hour(
+    db: Session,
+    cutoff: datetime,
+    batch_size: int,
+    after: Optional[datetime] = None
+) -> Optional[Tuple[int, datetime]]:
+    """
+    Collapse the oldest hour of checkpoints at or after `after` and before
+    cutoff that still has more than one row, keeping the newest checkpoint
+    of that hour.
+
+    Deletes at most batch_size rows and commits. Returns the number of rows
+    deleted and the position to resume from, or None when nothing is left.
+    """
+    while True:
+        query = db.query(HomeStateDB.last_updated).filter(HomeStateDB.last_updated < cutoff)
+        if after:
+            query = query.filter(HomeStateDB.last_updated >= after)
+        oldest = query.order_by(HomeStateDB.last_updated).first()
+        if not oldest:
+            return None
+
+        hour = truncate_to_hour(oldest.last_updated)
+        hour_end = min(hour + timedelta(hours=1), cutoff)
+        ids = [
+            row.id for row in db.query(HomeStateDB.id).filter(
+                HomeStateDB.last_updated >= hour,
+                HomeStateDB.last_updated < hour_end
+            ).order_by(HomeStateDB.id.desc()).limit(batch_size + 1)
+        ]
+        if len(ids) > 1:
+            # ids[0] is the newest checkpoint in the hour and survives
+            stale = ids[1:]
+            db.query(HomeStateDB).filter(
+                HomeStateDB.id.in_(stale)
+            ).delete(synchronize_session=False)
+            db.commit()
+            # Revisit the hour if the batch could not cover all of it
+            return len(stale), hour if len(ids) > batch_size else hour_end
+        after = hour_end
+
+class RetentionJob:
+    """
+    Applies the event, temperature and home state retention policies in
+    small batches,
+    either on demand or periodically on a background thread.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        event_retention_days: float = EVENT_RETENTION_DAYS,
+        temperature_retention_days: float = TEMPERATURE_RETENTION_DAYS,
+        snapshot_retention_hours: float = SNAPSHOT_RETENTION_HOURS,
+        batch_size: int = BATCH_SIZE,
+        interval: float = RUN_INTERVAL
+    ):
+        self.session_factory = session_factory
+        self.event_retention_days = event_retention_days
+        self.temperature_retention_days = temperature_retention_days
+        self.snapshot_retention_hours = snapshot_retention_hours
+        self.batch_size = batch_size
+        self.interval = interval
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def run_once(self) -> Dict[str, Any]:
+        """Apply all policies until nothing is left to prune."""
+        with self._run_lock:
+            started = time.perf_counter()
+            now = datetime.now()
+            stats = {
+                "started_at": now,
+                "events_rolled_up": 0,
+                "temperature_readings_rolled_up": 0,
+                "snapshots_deleted": 0,
+                "batches": 0
+            }
+
+            event_cutoff = now - timedelta(days=self.event_retention_days)
+            temperature_cutoff = now - timedelta(days=self.temperature_retention_days)
+            snapshot_cutoff = now - timedelta(hours=self.snapshot_retention_hours)
+
+            db = self.session_factory()
+            try:
+                while not self._stop.is_set():
+                    removed = rollup_events_batch(db, event_cutoff, self.batch_size)
+                    if not removed:
+                        break
+                    stats["events_rolled_up"] += removed
+                    stats["batches"] += 1
+                    time.sleep(BATCH_PAUSE)
+
+                while not self._stop.is_set():
+                    removed = rollup_temperatures_batch(db, temperature_cutoff, self.batch_size)
+                    if not removed:
+                        break
+                    stats["temperature_readings_rolled_up"] += removed
+                    stats["batches"] += 1
+                    time.sleep(BATCH_PAUSE)
+                # Keep the in-memory series in step with the table
+                temperature_series.prune(db, temperature_cutoff)
+
+                after = None
+                while not self._stop.is_set():
+                    collapsed = collapse_snapshots_hour(db, snapshot_cutoff, self.batch_size, after)
+                    if not collapsed:
+                        break
+                    deleted, after = collapsed
+                    stats["snapshots_deleted"] += deleted
+                    stats["batches"] += 1
+                    time.sleep(BATCH_PAUSE)
+            except Exception as e:
+                db.rollback()
+                stats["error"] = str(e)
+                print(f"Retention run failed: {e}")
+            finally:
+                db.close()
+
+            stats["duration_ms"] = (time.perf_counter() - started) * 1000
+            self.last_run = stats
+            return stats
+
+    def start(self) -> None:
+        """Run retention every `interval` seconds on a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "event_retention_days": self.event_retention_days,
+            "temperature_retention_days": self.temperature_retention_days,
+            "snapshot_retention_hours": self.snapshot_retention_hours,
+            "batch_size": self.batch_size,
+            "interval_seconds": self.interval,
+            "last_run": self.last_run
+        }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+retention_job = RetentionJob()
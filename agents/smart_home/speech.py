@@ -0,0 +1,127 @@
+from typing import Dict, Any, Optional
+import os
+import queue
+import threading
+import pyttsx3
+
+# Maximum number of announcements waiting to be spoken
+SPEECH_QUEUE_SIZE = int(os.getenv("SPEECH_QUEUE_SIZE", "10"))
+
+_STOP = object()
+
+class SpeechQueue:
+    """
+    Plays text-to-speech announcements on a dedicated worker thread.
+
+    pyttsx3 blocks for as long as the speech lasts, so it must never run on
+    the event loop. Messages go through a bounded queue; a message that is
+    already waiting is not queued twice, and new messages are dropped when
+    the queue is full rather than blocking the caller.
+    """
+
+    def __init__(self, maxsize: int = SPEECH_QUEUE_SIZE):
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._pending: set = set()
+        self._thread: Optional[threading.Thread] = None
+        self._engine = None
+        self._engine_ready = False
+        self.current: Optional[str] = None
+        self.spoken = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the worker thread if it is not running."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="speech-worker", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Ask the worker to finish the current message and exit."""
+        with self._lock:
+            thread = self._thread
+        if not thread or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+    def enqueue(self, message: str) -> str:
+        """
+        Queue a message for playback without waiting for it.
+
+        Returns "queued", "coalesced" if the same message is already waiting,
+        or "dropped" if the queue is full.
+        """
+        self.start()
+        with self._lock:
+            if message in self._pending:
+                self.coalesced += 1
+                return "coalesced"
+            try:
+                self._queue.put_nowait(message)
+            except queue.Full:
+                self.dropped += 1
+                return "dropped"
+            self._pending.add(message)
+        return "queued"
+
+    def status(self) -> Dict[str, Any]:
+        """Current worker and queue state."""
+        with self._lock:
+            return {
+                "running": bool(self._thread and self._thread.is_alive()),
+                "tts_available": self._engine is not None,
+                "speaking": self.current,
+                "queued": self._queue.qsize(),
+                "capacity": self._queue.maxsize,
+                "spoken": self.spoken,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "failed": self.failed
+            }
+
+    def _init_engine(self) -> None:
+        """Initialize pyttsx3 on the worker thread that will use it."""
+        self._engine_ready = True
+        try:
+            self._engine = pyttsx3.init()
+        except Exception as e:
+            print(f"Warning: TTS engine initialization failed: {e}")
+            self._engine = None
+
+    def _run(self) -> None:
+        if not self._engine_ready:
+            self._init_engine()
+
+        while True:
+            message = self._queue.get()
+            if message is _STOP:
+                break
+
+            with self._lock:
+                self._pending.discard(message)
+                self.current = message
+
+            print(f"Welcome message: {message}")  # Fallback/logging
+            try:
+                if self._engine:
+                    self._engine.say(message)
+                    self._engine.runAndWait()
+                self.spoken += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"TTS playback failed: {e}")
+            finally:
+                with self._lock:
+                    self.current = None
+
+speech_queue = SpeechQueue()
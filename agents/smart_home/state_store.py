@@ -0,0 +1,162 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+import copy
+import os
+from .database import HomeStateDB, HomeStateDeltaDB, TemperatureReadingDB
+
+# Sections of the home state that are tracked key by key
+STATE_SECTIONS = ("temperature", "lights", "security", "plants")
+
+# Fold deltas into a new checkpoint once this many have accumulated
+CHECKPOINT_INTERVAL = int(os.getenv("HOME_STATE_CHECKPOINT_INTERVAL", "100"))
+
+# Number of compacted checkpoints kept in home_state
+CHECKPOINT_KEEP = int(os.getenv("HOME_STATE_CHECKPOINT_KEEP", "10"))
+
+StateChanges = Dict[str, Dict[str, Any]]
+StateVersion = Tuple[int, int]
+
+def load_home_state(db: Session) -> Optional[HomeStateDB]:
+    """
+    Rebuild the current home state from the latest checkpoint and the deltas
+    written after it.
+
+    Returns a transient HomeStateDB (not attached to the session) so callers
+    can use the same *_dict accessors as for a stored snapshot, or None if no
+    checkpoint exists yet.
+    """
+    checkpoint = db.query(HomeStateDB).order_by(HomeStateDB.id.desc()).first()
+    if not checkpoint:
+        return None
+
+    sections = {
+        section: copy.deepcopy(getattr(checkpoint, section) or {})
+        for section in STATE_SECTIONS
+    }
+    last_updated = checkpoint.last_updated
+
+    # Compaction removes folded deltas, so every remaining delta is newer
+    # than the latest checkpoint
+    deltas = db.query(HomeStateDeltaDB).order_by(HomeStateDeltaDB.id).all()
+    for delta in deltas:
+        _apply_delta(sections, delta.section, delta.key, delta.value)
+        last_updated = max(last_updated, delta.timestamp)
+
+    return HomeStateDB(**sections, last_updated=last_updated)
+
+def get_state_version(db: Session) -> StateVersion:
+    """
+    Return the (checkpoint id, delta id) pair identifying the stored state.
+
+    Both are primary key lookups, and every write either appends a delta or
+    creates a newer checkpoint, so any change produces a larger version.
+    Pending changes must be flushed first to be reflected.
+    """
+    checkpoint_id = db.query(func.max(HomeStateDB.id)).scalar() or 0
+    delta_id = db.query(func.max(HomeStateDeltaDB.id)).scalar() or 0
+    return checkpoint_id, delta_id
+
+def save_checkpoint(db: Session, sections: StateChanges, timestamp: datetime) -> HomeStateDB:
+    """Store a full snapshot of the home state as a checkpoint."""
+    checkpoint = HomeStateDB(
+        **{section: sections.get(section, {}) for section in STATE_SECTIONS},
+        last_updated=timestamp
+    )
+    db.add(checkpoint)
+    return checkpoint
+
+def serialize_home_status(home_status) -> StateChanges:
+    """Convert a HomeStatus into the JSON-compatible per-section layout."""
+    return {
+        "temperature": dict(home_status.temperature),
+        "lights": {k: v.value for k, v in home_status.lights.items()},
+        "security": {k: v.value for k, v in home_status.security.items()},
+        "plants": {
+            name: {
+                "last_watered": plant.last_watered.isoformat(),
+                "moisture_level": plant.moisture_level.value,
+                "needs_water": plant.needs_water,
+                "notes": plant.notes
+            }
+            for name, plant in home_status.plants.items()
+        }
+    }
+
+def write_state_changes(db: Session, changes: StateChanges, timestamp: datetime) -> int:
+    """
+    Append one delta row per changed key and compact if the delta log is due.
+
+    Temperature changes are also appended to the temperature_readings
+    series. The caller owns the transaction and is expected to commit.
+    Returns the number of delta rows written.
+    """
+    written = 0
+    delta = None
+    for section, section_changes in changes.items():
+        for key, value in section_changes.items():
+            delta = HomeStateDeltaDB(
+                section=section,
+                key=key,
+                value=value,
+                timestamp=timestamp
+            )
+            db.add(delta)
+            if section == "temperature" and value is not None:
+                db.add(TemperatureReadingDB(room=key, timestamp=timestamp, value=value))
+            written += 1
+
+    if written:
+        db.flush()
+        if pending_delta_count(db, delta.id) >= CHECKPOINT_INTERVAL:
+            compact_home_state(db)
+    return written
+
+def pending_delta_count(db: Session, last_delta_id: int) -> int:
+    """
+    Number of deltas since the latest checkpoint, up to last_delta_id.
+
+    Deltas are only appended and are removed all at once by compaction, so
+    their ids are contiguous and the count follows from the oldest id (a
+    primary key lookup) without scanning the table.
+    """
+    first_delta_id = db.query(func.min(HomeStateDeltaDB.id)).scalar()
+    return last_delta_id - first_delta_id + 1
+
+def compact_home_state(db: Session) -> Optional[HomeStateDB]:
+    """
+    Fold all pending deltas into a new checkpoint, drop the folded deltas and
+    prune checkpoints beyond CHECKPOINT_KEEP.
+    """
+    state = load_home_state(db)
+    if state is None:
+        return None
+
+    checkpoint = save_checkpoint(
+        db,
+        {section: getattr(state, section) for section in STATE_SECTIONS},
+        state.last_updated
+    )
+    db.query(HomeStateDeltaDB).delete(synchronize_session=False)
+    db.flush()
+
+    stale_ids = [
+        row.id for row in db.query(HomeStateDB.id)
+        .order_by(HomeStateDB.id.desc())
+        .offset(CHECKPOINT_KEEP)
+        .all()
+    ]
+    if stale_ids:
+        db.query(HomeStateDB).filter(
+            HomeStateDB.id.in_(stale_ids)
+        ).delete(synchronize_session=False)
+    return checkpoint
+
+def _apply_delta(sections: StateChanges, section: str, key: str, value: Any) -> None:
+    """Apply a single delta to the in-memory section dictionaries."""
+    target = sections.setdefault(section, {})
+    if value is None:
+        target.pop(key, None)
+    else:
+        target[key] = value
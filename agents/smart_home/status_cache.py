@@ -0,0 +1,63 @@
+from sqlalchemy.orm import Session
+from typing import Optional
+import os
+import threading
+import time
+from .models import HomeStatus
+from .state_store import StateVersion, get_state_version
+
+# Seconds a cached status is served without checking the stored version
+REVALIDATE_SECONDS = float(os.getenv("HOME_STATUS_CACHE_REVALIDATE_SECONDS", "1.0"))
+
+class HomeStatusCache:
+    """
+    Versioned in-memory copy of the validated current HomeStatus.
+
+    Write paths in this process store the status they just committed. Reads
+    are served from memory and only compare the stored state version once
+    every REVALIDATE_SECONDS, which picks up writes made by other processes.
+    """
+
+    def __init__(self, revalidate_seconds: float = REVALIDATE_SECONDS):
+        self.revalidate_seconds = revalidate_seconds
+        self._lock = threading.Lock()
+        self._status: Optional[HomeStatus] = None
+        self._version: Optional[StateVersion] = None
+        self._checked_at = 0.0
+
+    def get(self, db: Session) -> Optional[HomeStatus]:
+        """Return a copy of the cached status, or None if it is missing or stale."""
+        with self._lock:
+            status, version, checked_at = self._status, self._version, self._checked_at
+
+        if status is None:
+            return None
+
+        if time.monotonic() - checked_at >= self.revalidate_seconds:
+            if get_state_version(db) != version:
+                self.invalidate()
+                return None
+            with self._lock:
+                if self._version == version:
+                    self._checked_at = time.monotonic()
+
+        # Handlers mutate the status they receive, so never hand out the cached object
+        return status.model_copy(deep=True)
+
+    def put(self, status: HomeStatus, version: StateVersion) -> None:
+        """Store a status unless a newer version is already cached."""
+        with self._lock:
+            if self._version is not None and version < self._version:
+                return
+            self._status = status.model_copy(deep=True)
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Drop the cached status so the next read reloads it."""
+        with self._lock:
+            self._status = None
+            self._version = None
+            self._checked_at = 0.0
+
+home_status_cache = HomeStatusCache()
@@ -0,0 +1,164 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Sequence
+import threading
+import numpy as np
+from .database import TemperatureReadingDB
+
+# Rows pulled from temperature_readings per refresh query
+LOAD_BATCH_SIZE = 10000
+
+class RoomSeries:
+    """
+    Append-only column arrays of one room's readings.
+
+    Timestamps are stored as float64 epoch seconds and values as float32.
+    Capacity doubles when full, so appends are amortized O(1).
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.values = np.empty(capacity, dtype=np.float32)
+        self.size = 0
+        self.is_sorted = True
+
+    def extend(self, times: np.ndarray, values: np.ndarray) -> None:
+        needed = self.size + len(times)
+        if needed > len(self.times):
+            capacity = max(needed, 2 * len(self.times))
+            self.times = np.resize(self.times, capacity)
+            self.values = np.resize(self.values, capacity)
+        if self.size and len(times) and times[0] < self.times[self.size - 1]:
+            self.is_sorted = False
+        self.times[self.size:needed] = times
+        self.values[self.size:needed] = values
+        self.size = needed
+        if self.is_sorted and len(times) > 1 and np.any(np.diff(times) < 0):
+            self.is_sorted = False
+
+    def _sort(self) -> None:
+        if not self.is_sorted:
+            order = np.argsort(self.times[:self.size], kind="stable")
+            self.times[:self.size] = self.times[:self.size][order]
+            self.values[:self.size] = self.values[:self.size][order]
+            self.is_sorted = True
+
+    def drop_before(self, before: float) -> int:
+        """Remove readings older than `before`. Returns the number removed."""
+        self._sort()
+        count = int(np.searchsorted(self.times[:self.size], before, side="left"))
+        if count:
+            remaining = self.size - count
+            self.times[:remaining] = self.times[count:self.size]
+            self.values[:remaining] = self.values[count:self.size]
+            self.size = remaining
+        return count
+
+    def window(self, since: Optional[float], until: Optional[float]) -> np.ndarray:
+        """Values with since <= timestamp < until, found by binary search."""
+        self._sort()
+        times = self.times[:self.size]
+        start = 0 if since is None else np.searchsorted(times, since, side="left")
+        end = self.size if until is None else np.searchsorted(times, until, side="left")
+        return self.values[start:end]
+
+class TemperatureSeries:
+    """
+    In-memory columnar copy of temperature_readings, one RoomSeries per room.
+
+    The table stays the source of truth; refresh() only pulls rows with an id
+    above the last one loaded, so readings written by any process show up
+    without rescanning.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rooms: Dict[str, RoomSeries] = {}
+        self._last_id = 0
+
+    def refresh(self, db: Session) -> None:
+        """Load readings added since the last refresh."""
+        with self._lock:
+            while True:
+                rows = db.query(
+                    TemperatureReadingDB.id,
+                    TemperatureReadingDB.room,
+                    TemperatureReadingDB.timestamp,
+                    TemperatureReadingDB.value
+                ).filter(
+                    TemperatureReadingDB.id > self._last_id
+                ).order_by(TemperatureReadingDB.id).limit(LOAD_BATCH_SIZE).all()
+                if not rows:
+                    return
+
+                by_room: Dict[str, List[tuple]] = {}
+                for row in rows:
+                    by_room.setdefault(row.room, []).append((row.timestamp.timestamp(), row.value))
+                for room, readings in by_room.items():
+                    columns = np.array(readings, dtype=np.float64)
+                    self._rooms.setdefault(room, RoomSeries()).extend(columns[:, 0], columns[:, 1])
+
+                self._last_id = rows[-1].id
+                if len(rows) < LOAD_BATCH_SIZE:
+                    return
+
+    def prune(self, db: Session, before: datetime) -> int:
+        """
+        Forget readings older than `before`, mirroring retention deleting them
+        from the table. Rooms left empty are dropped. Returns the number removed.
+
+        Tables created without AUTOINCREMENT hand out ids again once the
+        newest rows are deleted, so the load position is moved back to the
+        highest remaining id.
+        """
+        removed = 0
+        max_id = db.query(func.max(TemperatureReadingDB.id)).scalar() or 0
+        with self._lock:
+            self._last_id = min(self._last_id, max_id)
+            for room, series in list(self._rooms.items()):
+                removed += series.drop_before(before.timestamp())
+                if not series.size:
+                    del self._rooms[room]
+        return removed
+
+    def rooms(self) -> List[str]:
+        with self._lock:
+            return sorted(self._rooms)
+
+    def aggregate(
+        self,
+        room: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        percentiles: Sequence[float] = ()
+    ) -> Dict[str, Any]:
+        """Compute count, min, max, mean and percentiles of a room's readings in a window."""
+        with self._lock:
+            series = self._rooms.get(room)
+            if series is None:
+                values = np.empty(0, dtype=np.float32)
+            else:
+                values = series.window(
+                    since.timestamp() if since else None,
+                    until.timestamp() if until else None
+                ).astype(np.float64)
+
+        stats: Dict[str, Any] = {"room": room, "count": int(values.size)}
+        if not values.size:
+            stats.update({"min": None, "max": None, "mean": None})
+            stats["percentiles"] = {f"p{p:g}": None for p in percentiles}
+            return stats
+
+        stats.update({
+            "min": round(float(values.min()), 2),
+            "max": round(float(values.max()), 2),
+            "mean": round(float(values.mean()), 2)
+        })
+        points = np.percentile(values, list(percentiles)) if percentiles else []
+        stats["percentiles"] = {
+            f"p{p:g}": round(float(v), 2) for p, v in zip(percentiles, points)
+        }
+        return stats
+
+temperature_series = TemperatureSeries()
@@ -0,0 +1,170 @@
+"""
+Throughput benchmark for the smart home agent.
+
+Drives the /lights, /temperature, /arrive and /status endpoints in-process
+(no network) from a simulated fleet of devices against a throwaway SQLite
+database, and reports latency percentiles, throughput and database growth.
+
+Usage:
+    python benchmarks/smart_home_load.py --devices 20 --operations 200
+    python benchmarks/smart_home_load.py --mix lights=5,status=20,arrive=1 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Must be configured before the agent modules create their engine
+_db_dir = tempfile.mkdtemp(prefix="smart_home_bench_")
+DB_PATH = Path(_db_dir) / "smart_home.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from sqlalchemy import text
+from agents.smart_home.main import router
+from agents.smart_home.database import engine
+from agents.smart_home.event_sink import event_sink
+from agents.smart_home.speech import speech_queue
+
+ROOMS = ["living_room", "bedroom", "kitchen"]
+WRITE_OPERATIONS = {"lights", "temperature", "arrive"}
+TABLES = ["home_state", "home_state_delta", "event_log", "temperature_readings"]
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Parse 'lights=4,status=10' into operation weights."""
+    mix = {}
+    for part in value.split(","):
+        name, weight = part.split("=")
+        if name not in ("lights", "temperature", "arrive", "status"):
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}'")
+        mix[name] = int(weight)
+    return mix
+
+def table_counts() -> Dict[str, int]:
+    with engine.connect() as conn:
+        return {
+            table: conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            for table in TABLES
+        }
+
+async def run_device(
+    client: httpx.AsyncClient,
+    operations: int,
+    mix: Dict[str, int],
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+    rng: random.Random
+) -> None:
+    """One simulated device issuing a weighted random sequence of requests."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    for _ in range(operations):
+        operation = rng.choices(names, weights)[0]
+        room = rng.choice(ROOMS)
+        if operation == "lights":
+            request = client.post(f"/smart-home/lights/{room}", params={"status": rng.choice(["on", "off"])})
+        elif operation == "temperature":
+            request = client.post(f"/smart-home/temperature/{room}", params={"value": round(rng.uniform(65, 78), 1)})
+        elif operation == "arrive":
+            request = client.post("/smart-home/arrive")
+        else:
+            request = client.get("/smart-home/status")
+
+        started = time.perf_counter()
+        response = await request
+        latencies[operation].append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            errors[operation] = errors.get(operation, 0) + 1
+
+async def run_benchmark(devices: int, operations: int, mix: Dict[str, int], seed: int) -> Dict:
+    app = FastAPI()
+    app.include_router(router, prefix="/smart-home")
+    transport = httpx.ASGITransport(app=app)
+    latencies: Dict[str, List[float]] = {name: [] for name in mix}
+    errors: Dict[str, int] = {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Seed the initial state so it is not counted as a write
+        await client.get("/smart-home/status")
+        event_sink.flush()
+        rows_before = table_counts()
+        size_before = DB_PATH.stat().st_size
+
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            run_device(client, operations, mix, latencies, errors, random.Random(seed + i))
+            for i in range(devices)
+        ])
+        elapsed = time.perf_counter() - started
+
+    event_sink.stop()
+    speech_queue.stop(timeout=0)
+    rows_after = table_counts()
+    size_after = DB_PATH.stat().st_size
+
+    total = sum(len(values) for values in latencies.values())
+    writes = sum(len(latencies[name]) for name in mix if name in WRITE_OPERATIONS)
+    report = {
+        "devices": devices,
+        "operations": total,
+        "elapsed_s": round(elapsed, 3),
+        "ops_per_s": round(total / elapsed, 1),
+        "writes_per_s": round(writes / elapsed, 1),
+        "errors": errors,
+        "latency_ms": {},
+        "db_bytes_before": size_before,
+        "db_bytes_after": size_after,
+        "db_bytes_per_write": round((size_after - size_before) / writes, 1) if writes else None,
+        "row_growth": {table: rows_after[table] - rows_before[table] for table in TABLES}
+    }
+    for name, values in latencies.items():
+        if not values:
+            continue
+        samples = np.array(values)
+        report["latency_ms"][name] = {
+            "count": int(samples.size),
+            "p50": round(float(np.percentile(samples, 50)), 3),
+            "p99": round(float(np.percentile(samples, 99)), 3),
+            "max": round(float(samples.max()), 3)
+        }
+    return report
+
+def print_report(report: Dict) -> None:
+    print(f"{report['operations']} operations from {report['devices']} devices in {report['elapsed_s']}s")
+    print(f"  throughput: {report['ops_per_s']} ops/s, {report['writes_per_s']} writes/s")
+    print(f"  {'operation':<12}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in report["latency_ms"].items():
+        print(f"  {name:<12}{stats['count']:>8}{stats['p50']:>10}{stats['p99']:>10}{stats['max']:>10}")
+    print(f"  db size: {report['db_bytes_before']} -> {report['db_bytes_after']} bytes "
+          f"({report['db_bytes_per_write']} bytes/write)")
+    print(f"  row growth: {report['row_growth']}")
+    if report["errors"]:
+        print(f"  errors: {report['errors']}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=10, help="Concurrent simulated devices")
+    parser.add_argument("--operations", type=int, default=100, help="Requests per device")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("lights=4,temperature=4,status=10,arrive=1"),
+                        help="Weighted operation mix")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args.devices, args.operations, args.mix, args.seed))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
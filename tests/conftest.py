@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# The agent databases are created at import time, so point them at a
+# scratch file before any test imports them
+_DB_DIR = tempfile.mkdtemp(prefix="everything-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}")
+os.environ.setdefault("OCR_CACHE_DIR", os.path.join(_DB_DIR, "ocr_cache"))
+os.environ.setdefault("OCR_WORKERS", "1")
+os.environ.setdefault("RETENTION_INTERVAL_SECONDS", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    The agent routers mounted under the same prefixes as the root app.
+
+    Entered as a context so startup hooks run and background tasks (receipt
+    jobs, schedulers) share one event loop across requests.
+    """
+    from agents.inventory_manager.main import router as inventory_router
+    from agents.life_organizer.main import router as life_organizer_router
+    from agents.smart_home.main import router as smart_home_router
+
+    app = FastAPI()
+    app.include_router(life_organizer_router, prefix="/organizer")
+    app.include_router(smart_home_router, prefix="/smart-home")
+    app.include_router(inventory_router, prefix="/inventory")
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from agents.smart_home.automation import AutomationEngine, AutomationError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_condition_without_key_names_the_rule():
+    rules = [{
+        "name": "Night lights",
+        "trigger": {"type": "state_change"},
+        "conditions": [{"op": "eq", "value": "off"}]
+    }]
+    with pytest.raises(AutomationError, match="Night lights"):
+        AutomationEngine(rules)
+
+def test_time_rules_are_indexed():
+    engine = AutomationEngine([{
+        "name": "Morning",
+        "trigger": {"type": "time", "at": "07:00"},
+        "actions": [{"type": "set", "key": "lights.kitchen", "value": "on"}]
+    }])
+    assert engine.has_time_rules()
+    assert not AutomationEngine([]).has_time_rules()
+
+@pytest.mark.parametrize("content", ["{not json", '{"rules": [{"name": "Broken"}]}'])
+def test_invalid_rules_file_does_not_break_import(tmp_path, content):
+    rules = tmp_path / "rules.json"
+    rules.write_text(content)
+    env = {
+        **os.environ,
+        "AUTOMATION_RULES_PATH": str(rules),
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'home.db'}"
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", "from agents.smart_home.main import router"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert "starting with none" in result.stdout
@@ -0,0 +1,30 @@
+def book(client, date, duration_minutes=60, recurrence=None):
+    response = client.post("/organizer/appointment", json={
+        "title": "Busy",
+        "date": date,
+        "duration_minutes": duration_minutes,
+        "recurrence": recurrence
+    })
+    assert response.status_code == 200, response.text
+
+def test_free_windows_skip_busy_time(client):
+    book(client, "2091-03-01T10:00:00")
+    book(client, "2091-03-01T13:00:00", recurrence="FREQ=DAILY;COUNT=3")
+    response = client.get("/organizer/availability", params={
+        "start": "2091-03-01T09:00:00",
+        "end": "2091-03-01T17:00:00",
+        "duration_minutes": 90
+    })
+    assert response.status_code == 200
+    assert response.json()["free"] == [
+        {"start": "2091-03-01T11:00:00", "end": "2091-03-01T13:00:00"},
+        {"start": "2091-03-01T14:00:00", "end": "2091-03-01T17:00:00"}
+    ]
+
+def test_oversized_range_is_rejected(client):
+    response = client.get("/organizer/availability", params={
+        "start": "2091-01-01T00:00:00",
+        "end": "2391-01-01T00:00:00",
+        "duration_minutes": 30
+    })
+    assert response.status_code == 400
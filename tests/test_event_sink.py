@@ -0,0 +1,69 @@
+import json
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from agents.smart_home.database import SessionLocal, EventLogDB
+from agents.smart_home.event_sink import EventSink
+
+def logged(event_type):
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(EventLogDB).where(EventLogDB.event_type == event_type))
+    finally:
+        db.close()
+
+def quiet_sink(**kwargs):
+    # Never flushes in the background, so the test drives every flush
+    return EventSink(flush_interval=3600, batch_size=10 ** 6, **kwargs)
+
+def test_bad_row_is_dropped_without_blocking_the_batch():
+    sink = quiet_sink()
+    sink.submit("sink_test_bad_row", {"n": 1})
+    sink.submit("sink_test_bad_row", {"unserializable": object()})
+    sink.submit("sink_test_bad_row", {"n": 3})
+
+    assert sink.flush() == 2
+    assert logged("sink_test_bad_row") == 2
+    metrics = sink.metrics()
+    assert metrics["dropped"] == 1
+    assert metrics["queue_depth"] == 0
+
+def test_failed_batch_is_dropped_after_max_attempts(monkeypatch):
+    sink = quiet_sink(max_attempts=3)
+    sink.submit("sink_test_retry", {"n": 1})
+
+    def unavailable(rows):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+    monkeypatch.setattr(sink, "_insert", unavailable)
+
+    for _ in range(2):
+        assert sink.flush() == 0
+        assert sink.metrics()["queue_depth"] == 1
+    assert sink.flush() == 0
+    metrics = sink.metrics()
+    assert metrics["queue_depth"] == 0
+    assert metrics["dropped"] == 1
+    assert metrics["failed_flushes"] == 3
+
+def test_buffer_is_capped():
+    sink = quiet_sink(max_buffered=3)
+    for n in range(5):
+        sink.submit("sink_test_cap", {"n": n})
+
+    metrics = sink.metrics()
+    assert metrics["queue_depth"] == 3
+    assert metrics["dropped"] == 2
+    assert sink.flush() == 3
+
+def test_export_matches_event_history_timestamps(client):
+    from agents.smart_home.event_sink import log_event
+    log_event("sink_test_export", {"n": 1})
+
+    history = client.get("/smart-home/events", params={"event_type": "sink_test_export"}).json()
+    export = client.get("/smart-home/events/export", params={"event_type": "sink_test_export"})
+
+    assert export.status_code == 200
+    exported = [json.loads(line) for line in export.text.splitlines()]
+    assert [event["timestamp"] for event in exported] == [event["timestamp"] for event in history]
+    assert "T" in exported[0]["timestamp"]
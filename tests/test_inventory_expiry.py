@@ -0,0 +1,51 @@
+import time
+from datetime import datetime, timedelta
+
+from agents.inventory_manager.expiry import expiry_scheduler
+
+def test_delete_untracks_mixed_case_item(client):
+    expiry = (datetime.now() + timedelta(days=5)).isoformat()
+    response = client.post("/inventory/inventory/update", json={
+        "name": "Greek Yogurt",
+        "category": "groceries",
+        "quantity": 3,
+        "unit": "pieces",
+        "expiry_date": expiry
+    })
+    assert response.status_code == 200
+    assert "greek yogurt" in expiry_scheduler._expiry
+
+    assert client.delete("/inventory/inventory/Greek Yogurt").status_code == 200
+    assert "greek yogurt" not in expiry_scheduler._expiry
+
+def notices_for(client, name):
+    notices = client.get("/inventory/inventory/expiring/notices", params={"limit": 500}).json()
+    return [notice for notice in notices if notice["name"] == name]
+
+def wait_for_notices(client, name, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len(notices_for(client, name)) >= count:
+            break
+        time.sleep(0.05)
+    return notices_for(client, name)
+
+def test_update_after_notice_does_not_announce_again(client):
+    item = {
+        "name": "Fresh Basil",
+        "category": "groceries",
+        "quantity": 1,
+        "unit": "pieces",
+        # Inside the notice window, so it is announced straight away
+        "expiry_date": (datetime.now() + timedelta(hours=12)).replace(microsecond=0).isoformat()
+    }
+    client.post("/inventory/inventory/update", json=item)
+    assert len(wait_for_notices(client, "fresh basil", 1)) == 1
+
+    client.post("/inventory/inventory/update", json={**item, "quantity": 2})
+    time.sleep(0.3)
+    assert len(notices_for(client, "fresh basil")) == 1
+
+    later = (datetime.now() + timedelta(hours=20)).replace(microsecond=0).isoformat()
+    client.post("/inventory/inventory/update", json={**item, "expiry_date": later})
+    assert len(wait_for_notices(client, "fresh basil", 2)) == 2
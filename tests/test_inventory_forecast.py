@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from agents.inventory_manager import forecast
+from agents.inventory_manager.database import SessionLocal
+from agents.inventory_manager.forecast import ConsumptionForecaster
+from agents.inventory_manager.ledger import record_quantity_changes
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+@pytest.fixture
+def db(client):
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def record_daily(db, name, per_day, days, reason="update"):
+    for day in range(days):
+        record_quantity_changes(db, {name: -per_day}, reason, NOW - timedelta(days=days - 1 - day))
+    db.commit()
+
+def test_steady_consumption_gives_its_daily_rate(db):
+    record_daily(db, "forecast_test_milk", 1.0, 30)
+    forecaster = ConsumptionForecaster()
+    forecaster.refresh(db)
+
+    rate, = forecaster.daily_rates(["forecast_test_milk"], NOW)
+    assert rate == pytest.approx(1.0, rel=0.1)
+
+def test_only_consumption_counts(db):
+    record_quantity_changes(db, {"forecast_test_flour": 5.0}, "receipt", NOW - timedelta(days=3))
+    record_quantity_changes(db, {"forecast_test_flour": -5.0}, "delete", NOW - timedelta(days=1))
+    db.commit()
+    forecaster = ConsumptionForecaster()
+    forecaster.refresh(db)
+
+    assert forecaster.daily_rates(["forecast_test_flour", "forecast_test_unknown"], NOW).tolist() == [0.0, 0.0]
+
+def test_incremental_refresh_matches_full_load(db, monkeypatch):
+    incremental = ConsumptionForecaster()
+    for day in range(10):
+        record_quantity_changes(db, {"forecast_test_eggs": -2.0}, "update", NOW - timedelta(days=9 - day))
+        db.commit()
+        incremental.refresh(db)
+
+    monkeypatch.setattr(forecast, "LOAD_BATCH_SIZE", 3)
+    full = ConsumptionForecaster()
+    full.refresh(db)
+
+    assert incremental.daily_rates(["forecast_test_eggs"], NOW)[0] == pytest.approx(
+        full.daily_rates(["forecast_test_eggs"], NOW)[0]
+    )
+
+def test_forecast_orders_by_days_to_empty(db):
+    record_daily(db, "forecast_test_rice", 0.5, 14)
+    record_daily(db, "forecast_test_tea", 2.0, 14)
+    forecaster = ConsumptionForecaster()
+    forecaster.refresh(db)
+
+    results = forecaster.forecast([
+        {"name": "forecast_test_salt", "quantity": 1.0},
+        {"name": "forecast_test_rice", "quantity": 4.0},
+        {"name": "forecast_test_tea", "quantity": 4.0},
+    ], NOW)
+
+    assert [item["name"] for item in results] == [
+        "forecast_test_tea", "forecast_test_rice", "forecast_test_salt"
+    ]
+    tea = results[0]
+    assert tea["days_to_empty"] == pytest.approx(2.0, rel=0.15)
+    assert tea["runs_out_on"] == (NOW + timedelta(days=tea["days_to_empty"])).date()
+    assert results[-1]["days_to_empty"] is None and results[-1]["runs_out_on"] is None
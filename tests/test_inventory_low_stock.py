@@ -0,0 +1,38 @@
+from sqlalchemy import update
+
+from agents.inventory_manager.database import SessionLocal, LowStockDB
+from agents.inventory_manager.low_stock import backfill_low_stock
+
+def low_names(client):
+    return [item["name"] for item in client.get("/inventory/inventory/low").json()]
+
+def test_mixed_case_update_is_flagged_low(client):
+    response = client.post("/inventory/inventory/update", json={
+        "name": "Potato Chips",
+        "category": "snacks",
+        "quantity": 1,
+        "unit": "pieces",
+        "low_stock_threshold": 2
+    })
+    assert response.status_code == 200
+    assert "potato chips" in low_names(client)
+
+def test_backfill_repairs_wrong_flags(client):
+    client.post("/inventory/inventory/update", json={
+        "name": "Rice",
+        "category": "groceries",
+        "quantity": 0.5,
+        "unit": "pounds",
+        "low_stock_threshold": 1
+    })
+    db = SessionLocal()
+    try:
+        assert not backfill_low_stock(db)
+        # Same number of flags as items, but with the wrong contents
+        db.execute(update(LowStockDB).values(is_low=False))
+        db.commit()
+        assert "rice" not in low_names(client)
+        assert backfill_low_stock(db)
+    finally:
+        db.close()
+    assert "rice" in low_names(client)
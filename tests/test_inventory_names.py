@@ -0,0 +1,56 @@
+from agents.inventory_manager.database import SessionLocal, InventoryItemDB, InventoryLedgerDB, SchemaMigrationDB
+from agents.inventory_manager.migrations import MIGRATIONS, apply_migrations
+from agents.inventory_manager.names import normalize_stored_names
+
+def item(name, quantity):
+    return {"name": name, "category": "snacks", "quantity": quantity, "unit": "bags"}
+
+def stored_names(prefix):
+    db = SessionLocal()
+    try:
+        return sorted(
+            name for (name,) in db.query(InventoryItemDB.name).filter(InventoryItemDB.name.ilike(f"{prefix}%"))
+        )
+    finally:
+        db.close()
+
+def test_single_and_batch_updates_share_one_row(client):
+    assert client.post("/inventory/inventory/update", json=item("Trail Mix ", 1)).json()["name"] == "trail mix"
+    result = client.post("/inventory/inventory/update/batch", json=[item("TRAIL MIX", 4)]).json()
+    assert result["results"] == [{"name": "trail mix", "status": "updated"}]
+    client.post("/inventory/inventory/update", json=item("Trail mix", 6))
+    assert stored_names("trail") == ["trail mix"]
+
+def test_migration_merges_unnormalized_rows(client):
+    db = SessionLocal()
+    try:
+        db.add_all([
+            InventoryItemDB(name="Pretzels", category="snacks", quantity=2, unit="bags"),
+            InventoryItemDB(name="pretzels", category="snacks", quantity=3, unit="bags"),
+            InventoryItemDB(name=" PRETZELS", category="snacks", quantity=1, unit="bags"),
+            InventoryItemDB(name="Popcorn", category="snacks", quantity=1, unit="bags"),
+            InventoryItemDB(name="Éclairs", category="snacks", quantity=1, unit="boxes"),
+            InventoryLedgerDB(item_name="Pretzels", delta=2, reason="update")
+        ])
+        db.commit()
+
+        assert normalize_stored_names(db) == 5
+        assert normalize_stored_names(db) == 0
+        assert db.query(InventoryLedgerDB).filter(InventoryLedgerDB.item_name == "Pretzels").count() == 0
+    finally:
+        db.close()
+
+    assert stored_names("pretzels") == ["pretzels"]
+    assert stored_names("popcorn") == ["popcorn"]
+    assert stored_names("é") == ["éclairs"]
+    pretzels = [row for row in client.get("/inventory/snacks").json() if row["name"] == "pretzels"]
+    assert pretzels[0]["quantity"] == 6
+
+def test_migrations_run_once(client):
+    db = SessionLocal()
+    try:
+        # The startup hook already applied every migration to this database
+        assert db.query(SchemaMigrationDB.name).count() == len(MIGRATIONS)
+        assert apply_migrations(db) == []
+    finally:
+        db.close()
@@ -0,0 +1,22 @@
+import json
+import os
+import tempfile
+
+def spooled_files():
+    return [name for name in os.listdir(tempfile.gettempdir()) if name.startswith("receipt_")]
+
+def test_batch_errors_do_not_leak_spool_paths(client):
+    response = client.post("/inventory/upload/batch", files=[("files", ("broken.png", b"not an image", "image/png"))])
+    result = json.loads(response.text.splitlines()[0])
+    assert result["status"] == "error"
+    assert "'broken.png'" in result["message"]
+    assert tempfile.gettempdir() not in result["message"]
+
+def test_job_upload_is_spooled_and_removed(client):
+    before = set(spooled_files())
+    response = client.post("/inventory/upload/jobs", files={"file": ("job.png", b"not an image either", "image/png")})
+    assert response.status_code == 202
+    job = client.get(f"/inventory/upload/jobs/{response.json()['job_id']}", params={"wait": 30}).json()
+    assert job["status"] == "failed"
+    assert "'job.png'" in job["error"]
+    assert set(spooled_files()) <= before
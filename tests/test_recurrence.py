@@ -0,0 +1,47 @@
+import time
+from datetime import datetime
+
+from agents.life_organizer.recurrence import RecurrenceRule
+
+def walk_last(rule, dtstart):
+    last = None
+    for last in rule.occurrences(dtstart):
+        pass
+    return last
+
+def test_last_matches_walking_the_series():
+    dtstart = datetime(2025, 1, 31, 9, 30)
+    for text in (
+        "FREQ=DAILY;INTERVAL=3;COUNT=40",
+        "FREQ=DAILY;UNTIL=20250610T080000",
+        "FREQ=WEEKLY;BYDAY=MO,TH,SU;COUNT=25",
+        "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,FR;UNTIL=20260101",
+        "FREQ=WEEKLY;COUNT=30;UNTIL=20250401",
+        "FREQ=MONTHLY;COUNT=12",
+        "FREQ=MONTHLY;INTERVAL=2;UNTIL=20290301"
+    ):
+        rule = RecurrenceRule.parse(text)
+        assert rule.last(dtstart) == walk_last(rule, dtstart), text
+
+def test_last_with_distant_until_is_immediate():
+    rule = RecurrenceRule.parse("FREQ=DAILY;UNTIL=99991231")
+    started = time.perf_counter()
+    assert rule.last(datetime(2025, 1, 1, 9)) == datetime(9999, 12, 30, 9)
+    assert time.perf_counter() - started < 0.05
+
+def test_occurrences_stop_before_datetime_max():
+    rule = RecurrenceRule.parse("FREQ=WEEKLY")
+    occurrences = list(rule.occurrences(datetime(2025, 1, 1), datetime(9999, 12, 1), datetime.max))
+    assert occurrences[-1] == datetime(9999, 12, 29)
+
+def test_agenda_at_the_end_of_time(client):
+    response = client.post("/organizer/appointment", json={
+        "title": "Standup",
+        "date": "2099-01-05T23:30:00",
+        "duration_minutes": 60,
+        "recurrence": "FREQ=WEEKLY"
+    })
+    assert response.status_code == 200
+    response = client.get("/organizer/agenda", params={"start": "9999-06-01", "end": "9999-12-31T23:00"})
+    assert response.status_code == 200
+    assert response.json()["appointments"][-1]["start"] == "9999-12-27T23:30:00"
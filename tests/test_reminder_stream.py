@@ -0,0 +1,23 @@
+import asyncio
+
+from agents.life_organizer.main import stream_due_reminders
+from agents.life_organizer.reminder_scheduler import reminder_scheduler
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+def subscribers():
+    return reminder_scheduler.status()["subscribers"]
+
+def test_stream_subscribes_only_while_streaming():
+    async def scenario():
+        before = subscribers()
+        response = await stream_due_reminders(DisconnectedRequest())
+        # A response that is never streamed must not leave a subscriber behind
+        assert subscribers() == before
+        chunks = [chunk async for chunk in response.body_iterator]
+        assert chunks == []
+        assert subscribers() == before
+
+    asyncio.run(scenario())
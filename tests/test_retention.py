@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from agents.smart_home.database import SessionLocal, TemperatureReadingDB
+from agents.smart_home.retention import RetentionJob
+from agents.smart_home.temperature import TemperatureSeries, temperature_series
+
+def test_old_temperature_readings_roll_up_hourly(client):
+    hour = (datetime.now() - timedelta(days=40)).replace(minute=0, second=0, microsecond=0)
+    recent = datetime.now() - timedelta(hours=1)
+    db = SessionLocal()
+    try:
+        db.add_all([
+            TemperatureReadingDB(room="attic", timestamp=hour + timedelta(minutes=5), value=60.0),
+            TemperatureReadingDB(room="attic", timestamp=hour + timedelta(minutes=25), value=66.0),
+            TemperatureReadingDB(room="attic", timestamp=hour + timedelta(minutes=50), value=63.0),
+            TemperatureReadingDB(room="attic", timestamp=recent, value=70.0)
+        ])
+        db.commit()
+        temperature_series.refresh(db)
+    finally:
+        db.close()
+
+    # Small batches so the hour is merged across several of them
+    stats = RetentionJob(temperature_retention_days=30, batch_size=2, interval=0).run_once()
+    assert stats["temperature_readings_rolled_up"] == 3
+    assert "error" not in stats
+
+    hourly = client.get("/smart-home/temperature/hourly", params={"room": "attic"}).json()
+    assert hourly == [{
+        "hour": hour.isoformat(),
+        "room": "attic",
+        "count": 3,
+        "min": 60.0,
+        "max": 66.0,
+        "mean": 63.0
+    }]
+    attic = client.get("/smart-home/temperature/stats", params={"room": "attic"}).json()[0]
+    assert attic["count"] == 1
+
+def test_prune_rewinds_past_deleted_ids():
+    series = TemperatureSeries()
+    db = SessionLocal()
+    try:
+        db.add(TemperatureReadingDB(room="cellar", timestamp=datetime.now(), value=55.0))
+        db.commit()
+        # As if readings with higher ids were loaded and then deleted by
+        # retention, on a table that reuses ids
+        series._last_id = 10 ** 9
+        series.prune(db, datetime.now() - timedelta(days=30))
+        db.add(TemperatureReadingDB(room="cellar", timestamp=datetime.now(), value=57.0))
+        db.commit()
+        series.refresh(db)
+    finally:
+        db.close()
+    assert series.aggregate("cellar")["count"] == 1
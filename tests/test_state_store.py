@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+from agents.smart_home import state_store
+from agents.smart_home.database import SessionLocal, HomeStateDB, HomeStateDeltaDB
+from agents.smart_home.state_store import (
+    load_home_state, save_checkpoint, write_state_changes, get_state_version
+)
+
+@pytest.fixture
+def db(client):
+    db = SessionLocal()
+    if load_home_state(db) is None:
+        save_checkpoint(db, {}, datetime.now())
+        db.commit()
+    try:
+        yield db
+    finally:
+        # Leave no test rooms behind for the other tests
+        write_state_changes(db, {"lights": {"store_test_a": None, "store_test_b": None}}, datetime.now())
+        db.commit()
+        db.close()
+
+def pending_deltas(db):
+    return db.query(HomeStateDeltaDB).count()
+
+def test_compacts_once_interval_is_reached(db, monkeypatch):
+    state_store.compact_home_state(db)
+    db.commit()
+    monkeypatch.setattr(state_store, "CHECKPOINT_INTERVAL", 3)
+
+    write_state_changes(db, {"lights": {"store_test_a": "on"}}, datetime.now())
+    write_state_changes(db, {"lights": {"store_test_b": "on"}}, datetime.now())
+    db.commit()
+    assert pending_deltas(db) == 2
+
+    write_state_changes(db, {"lights": {"store_test_a": "off"}}, datetime.now())
+    db.commit()
+    assert pending_deltas(db) == 0
+    lights = load_home_state(db).lights
+    assert lights["store_test_a"] == "off"
+    assert lights["store_test_b"] == "on"
+
+def test_deltas_replay_over_the_checkpoint(db):
+    write_state_changes(db, {"lights": {"store_test_a": "on", "store_test_b": "on"}}, datetime(2026, 3, 1, 8, 0))
+    write_state_changes(db, {"lights": {"store_test_b": None}}, datetime(2026, 3, 1, 9, 0))
+    db.commit()
+
+    state = load_home_state(db)
+    assert state.lights["store_test_a"] == "on"
+    assert "store_test_b" not in state.lights
+    assert state.last_updated >= datetime(2026, 3, 1, 9, 0)
+
+def test_every_write_advances_the_version(db, monkeypatch):
+    monkeypatch.setattr(state_store, "CHECKPOINT_INTERVAL", 2)
+    versions = [get_state_version(db)]
+    for value in ("on", "off", "on"):
+        write_state_changes(db, {"lights": {"store_test_a": value}}, datetime.now())
+        db.flush()
+        versions.append(get_state_version(db))
+    db.commit()
+
+    assert versions == sorted(set(versions))
+
+def test_compaction_keeps_recent_checkpoints(db, monkeypatch):
+    monkeypatch.setattr(state_store, "CHECKPOINT_KEEP", 2)
+    for value in ("on", "off", "on"):
+        write_state_changes(db, {"lights": {"store_test_a": value}}, datetime.now())
+        state_store.compact_home_state(db)
+    db.commit()
+
+    assert db.query(HomeStateDB).count() == 2
+    assert load_home_state(db).lights["store_test_a"] == "on"
@@ -0,0 +1,60 @@
+import asyncio
+import json
+from datetime import datetime
+
+from agents.smart_home.main import stream_home_status
+from agents.smart_home.broadcast import StatusBroadcaster, RESYNC, status_broadcaster
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+def test_stream_releases_subscription_on_disconnect(client):
+    async def scenario():
+        before = status_broadcaster.subscriber_count
+        response = await stream_home_status(DisconnectedRequest())
+        assert status_broadcaster.subscriber_count == before
+        chunks = [chunk async for chunk in response.body_iterator]
+        assert chunks == []
+        assert status_broadcaster.subscriber_count == before
+
+    asyncio.run(scenario())
+
+def test_publish_fans_out_one_diff_per_change():
+    async def scenario():
+        broadcaster = StatusBroadcaster()
+        first, second = broadcaster.subscribe(), broadcaster.subscribe()
+        broadcaster.publish({}, NOW)
+        broadcaster.publish({"lights": {"kitchen": "on"}}, NOW)
+
+        for subscription in (first, second):
+            event_type, payload = await subscription.get(1)
+            assert event_type == "diff"
+            assert json.loads(payload) == {
+                "sequence": 1,
+                "changes": {"lights": {"kitchen": "on"}},
+                "last_updated": NOW.isoformat()
+            }
+            assert await subscription.get(0.01) is None
+
+        broadcaster.unsubscribe(first)
+        assert broadcaster.metrics() == {"subscribers": 1, "published": 1, "queue_size": broadcaster.queue_size}
+        event_type, payload = broadcaster.snapshot_message({"lights": {}}, NOW)
+        assert event_type == "snapshot" and json.loads(payload)["sequence"] == 1
+
+    asyncio.run(scenario())
+
+def test_lagging_subscriber_is_told_to_resync():
+    async def scenario():
+        broadcaster = StatusBroadcaster(queue_size=2)
+        subscription = broadcaster.subscribe()
+        for n in range(3):
+            broadcaster.publish({"temperature": {"office": 20 + n}}, NOW)
+        await asyncio.sleep(0)
+
+        assert await subscription.get(1) == RESYNC
+        assert await subscription.get(0.01) is None
+
+    asyncio.run(scenario())